@@ -1,16 +1,251 @@
 import pandas as pd
 import re
+import calendar
+import threading
+from collections import OrderedDict
 import config
+from master_dataset import read_master, master_version
+from query_engine import QueryEngine
+
+# --- Vocabulary ---
+MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+MONTH_PATTERN = r"\b(" + "|".join(sorted(MONTHS, key=len, reverse=True)) + r")\.?\s+(\d{4})\b"
+
+GROUP_PATTERNS = [
+    (r"\b(daily|per day|by day|each day)\b", 'day'),
+    (r"\b(weekly|per week|by week|each week)\b", 'week'),
+    (r"\b(monthly|per month|by month|each month)\b", 'month'),
+    (r"\b(yearly|annual|annually|per year|by year|each year)\b", 'year'),
+    (r"\b(by|per|each|across) branch(es)?\b", 'Branch'),
+    (r"\b(by|per|each|across) (transaction )?types?\b", 'Transaction_Type'),
+    (r"\b(by|per|each|across) customers?\b", 'Customer_Name'),
+]
+TOP_PATTERN = r"\b(top|largest|biggest|highest)\b\s*(\d+)?"
+TOP_TARGETS = [(r"\b(customers?|clients?)\b", 'Customer_Name'), (r"\b(branch|branches)\b", 'Branch'),
+               (r"\btypes?\b", 'Transaction_Type')]
+YEAR = r"((?:19|20)\d{2})"
+TOP_NOUNS = {'Customer_Name': "customers", 'Branch': "branches", 'Transaction_Type': "transaction types"}
+PERIOD_FORMATS = {'day': ("Day", '%Y-%m-%d'), 'week': ("Week of", '%Y-%m-%d'),
+                  'month': ("Month", '%Y-%m'), 'year': ("Year", '%Y')}
+GROUP_TITLES = {'day': "Daily", 'week': "Weekly", 'month': "Monthly", 'year': "Yearly",
+                'Branch': "Per-branch", 'Transaction_Type': "Per-type", 'Customer_Name': "Per-customer"}
+METRIC_COLUMNS = {'total': 'Amount', 'average': 'Average', 'count': 'Count'}
+MAX_TABLE_ROWS = 24  # Group results longer than this are summarized in the chat text
+
+
+def parse_date_range(query, anchor=None):
+    """
+    Extracts a date range as (start, end_exclusive, label), or (None, None, None).
+    Understands ISO dates (between/from/since/before), "March 2023", years
+    ("in 2023", "from 2020 to 2022", "since 2021") and "last N days/weeks/months/years"
+    (counted back from `anchor`, the latest transaction date). A bare number is
+    only a year after a date word, so "top 2000 transactions" has no date range.
+    """
+    day = pd.Timedelta(days=1)
+    query = re.sub(TOP_PATTERN, " ", query)  # The top-N count is never a year
+
+    dates = re.findall(r"\b(\d{4}-\d{2}-\d{2})\b", query)
+    if dates:
+        first = pd.Timestamp(dates[0])
+        if len(dates) >= 2:
+            last = pd.Timestamp(dates[1])
+            return first, last + day, f"from {first.date()} to {last.date()}"
+        if re.search(r"\b(since|after|from)\b", query):
+            return first, None, f"since {first.date()}"
+        if re.search(r"\b(before|until|till)\b", query):
+            return None, first, f"before {first.date()}"
+        return first, first + day, f"on {first.date()}"
+
+    month = re.search(MONTH_PATTERN, query)
+    if month:
+        start = pd.Timestamp(year=int(month.group(2)), month=MONTHS[month.group(1)], day=1)
+        return start, start + pd.DateOffset(months=1), f"in {start.strftime('%B %Y')}"
+
+    last = re.search(r"\b(last|past|previous)\s+(\d+\s+)?(day|week|month|year)s?\b", query)
+    if last and anchor is not None:
+        n = int(last.group(2) or 1)
+        unit = last.group(3)
+        end = anchor.normalize() + day
+        start = end - (pd.DateOffset(days=n) if unit == 'day' else pd.DateOffset(weeks=n) if unit == 'week'
+                       else pd.DateOffset(months=n) if unit == 'month' else pd.DateOffset(years=n))
+        return start, end, f"in the last {n} {unit}{'s' if n > 1 else ''} (to {anchor.date()})"
+
+    span = re.search(rf"\b(?:from|between)\s+{YEAR}\s*(?:to|and|until|till|through|-)\s*{YEAR}\b", query)
+    if span:
+        lo, hi = sorted(int(y) for y in span.groups())
+        return pd.Timestamp(year=lo, month=1, day=1), pd.Timestamp(year=hi + 1, month=1, day=1), f"from {lo} to {hi}"
+
+    year = re.search(rf"\b(in|during|since|after|from|before|until|till)\s+(?:the\s+year\s+)?{YEAR}\b", query)
+    if year:
+        word, year = year.group(1), int(year.group(2))
+        if word in ('since', 'after', 'from'):
+            return pd.Timestamp(year=year, month=1, day=1), None, f"since {year}"
+        if word in ('before', 'until', 'till'):
+            return None, pd.Timestamp(year=year, month=1, day=1), f"before {year}"
+        return pd.Timestamp(year=year, month=1, day=1), pd.Timestamp(year=year + 1, month=1, day=1), f"in {year}"
+
+    return None, None, None
+
+
+def parse_group_by(query):
+    for pattern, group in GROUP_PATTERNS:
+        if re.search(pattern, query):
+            return group
+    return None
+
+
+def parse_top_n(query):
+    """
+    Returns (n, target) for "top 5 customers"-style queries; target None means
+    individual transactions. The target is the first customer/branch/type noun
+    after the trigger word, wherever it is ("highest spending customers").
+    """
+    match = re.search(TOP_PATTERN, query)
+    if not match:
+        return None, None
+    n = int(match.group(2) or 10)
+    rest = query[match.end():]
+    if re.match(r"\s*transactions?\b(?!\s+types?)", rest):
+        return n, None
+    found = []
+    for pattern, target in TOP_TARGETS:
+        noun = re.search(pattern, rest)
+        if noun:
+            found.append((noun.start(), target))
+    return n, min(found)[1] if found else None
+
+
+def parse_metric(query):
+    if re.search(r"\b(how many|count|number of)\b", query):
+        return 'count'
+    if re.search(r"\b(average|avg|mean)\b", query):
+        return 'average'
+    if re.search(r"\b(totals?|sums?|how much|volume)\b", query):
+        return 'total'
+    return None
+
+
+def markdown_table(df, value_col, group_by=None):
+    """Small markdown table of a grouped result (first column + the requested metric)."""
+    key = df.columns[0]
+    header, date_format = PERIOD_FORMATS.get(group_by, (key.replace('_', ' '), None))
+    lines = [f"| {header} | {value_col} |", "|---|---|"]
+    for k, v in zip(df[key], df[value_col]):
+        label = k.strftime(date_format) if date_format else k
+        if pd.isna(v):
+            value = "—"  # e.g. the average of a group whose amounts are all missing
+        else:
+            value = f"{int(v):,}" if value_col == 'Count' else f"${v:,.2f}"
+        lines.append(f"| {label} | {value} |")
+    return "\n".join(lines)
+
+
+class QueryCache:
+    """
+    Process-wide LRU cache of answers, keyed by (data version, parsed query spec),
+    so rephrasings of the same question hit the same entry. Bounded by entry
+    count and approximate bytes. When a newer data version shows up (the
+    processor appended rows), every older answer is dropped.
+    """
+    def __init__(self, max_entries=None, max_mb=None):
+        self.max_entries = max_entries or config.QUERY_CACHE_ENTRIES
+        self.max_bytes = (max_mb or config.QUERY_CACHE_MB) * 1024 * 1024
+        self._entries = OrderedDict()  # key -> (response, size)
+        self._lock = threading.Lock()
+        self.version = None
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _copy(response):
+        """Independent copy of a response, so callers can't mutate a cached frame."""
+        response = dict(response)
+        if isinstance(response.get('data'), pd.DataFrame):
+            response['data'] = response['data'].copy()
+        return response
+
+    @staticmethod
+    def _size(response):
+        data = response.get('data')
+        size = len(response.get('text', ''))
+        if isinstance(data, pd.DataFrame):
+            size += int(data.memory_usage(deep=True).sum())
+        return size
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self.bytes = 0
+            self.version = version
+
+    def get(self, version, spec_key):
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(spec_key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(spec_key)
+            self.hits += 1
+            return self._copy(entry[0])
+
+    def put(self, version, spec_key, response):
+        size = self._size(response)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(version)
+            old = self._entries.pop(spec_key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            self._entries[spec_key] = (self._copy(response), size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.bytes -= evicted
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "size_mb": self.bytes / (1024 * 1024),
+                "invalidations": self.invalidations,
+            }
+
+
+QUERY_CACHE = QueryCache()
+
 
 class BankingAI:
-    def __init__(self, data_path=None):
-        if data_path:
-            self.df = pd.read_csv(data_path)
-            # Ensure dates are datetime objects for querying
-            if 'Transaction_Date' in self.df.columns:
-                self.df['Transaction_Date'] = pd.to_datetime(self.df['Transaction_Date'])
+    def __init__(self, data_path=None, df=None, version=None, cache=None):
+        """
+        df: an already-loaded master frame to share (e.g. master_dataset.get_master_dataset()),
+        so the UI and the assistant hold one copy. Otherwise data_path (the master CSV or the
+        Parquet store directory) is read with the shared typed loader.
+        version: the data's change token (master_dataset.master_version); answers are
+        cached per version in `cache` (QUERY_CACHE by default). No version, no caching.
+        """
+        if df is not None:
+            self.df = df
+        elif data_path:
+            version = version or master_version(data_path)
+            loaded = read_master(data_path)
+            self.df = loaded if loaded is not None else pd.DataFrame()
         else:
             self.df = pd.DataFrame()
+        self.version = version
+        self.cache = cache or QUERY_CACHE
+        # Indexes are built once here; queries only read them
+        self.engine = QueryEngine(self.df) if not self.df.empty else None
 
     def parse_intent(self, query):
         """
@@ -23,63 +258,127 @@ class BankingAI:
             return 'summary'
         return 'query'
 
+    def parse_query(self, query):
+        """
+        Natural language -> normalized query spec (filters, date range, grouping,
+        top-N, metric). Two phrasings of the same question give the same spec.
+        """
+        query = query.lower()
+        branches = self.engine.find_labels('Branch', query)
+        types = self.engine.find_labels('Transaction_Type', query)
+        start, end, date_label = parse_date_range(query, anchor=self.engine.max_date)
+        top_n, top_target = parse_top_n(query)
+        group_by = parse_group_by(query)
+        metric = parse_metric(query)
+        if metric is None and (group_by or top_n):
+            metric = 'total'  # Groups and rankings default to the amount total
+        return {
+            "branches": tuple(sorted(label for label, _ in branches)),
+            "types": tuple(sorted(label for label, _ in types)),
+            "start": start,
+            "end": end,
+            "date_label": date_label,
+            "group_by": group_by,
+            "top_n": top_n,
+            "top_target": top_target,
+            "metric": metric,
+            "chart": self.parse_intent(query) == 'chart' or 'trend' in query,
+        }
+
     def process_query(self, query):
         """
         The Core AI Logic.
-        Translates Natural Language -> Filtered DataFrame -> Answer.
+        Translates Natural Language -> Query Spec -> Indexed Aggregation -> Answer.
         """
-        query = query.lower()
-        response = {"text": "", "data": None, "type": "text"}
-        
         if self.df.empty:
             return {"text": "No data loaded. Please run the cleaning pipeline first.", "type": "error"}
+        spec = self.parse_query(query)
+        if self.version is None:
+            return self.execute(spec)
+
+        key = tuple(sorted(spec.items()))
+        response = self.cache.get(self.version, key)
+        if response is None:
+            response = self.execute(spec)
+            self.cache.put(self.version, key, response)
+        return response
+
+    def execute(self, spec):
+        """Runs a parsed query spec against the indexes (no frame copies)."""
+        response = {"text": "", "data": None, "type": "text"}
+        codes = lambda dim, labels: [code for label in labels for code in self.engine.labels[dim][label.lower()]] or None
+        selection = self.engine.select(
+            branches=codes('Branch', spec["branches"]),
+            types=codes('Transaction_Type', spec["types"]),
+            start=spec["start"],
+            end=spec["end"],
+        )
+
+        # Human-readable context: "for London (Credit) in 2023"
+        context = ""
+        if spec["branches"]:
+            context += f" for {', '.join(spec['branches'])}"
+        if spec["types"]:
+            context += f" ({', '.join(spec['types'])})"
+        if spec["date_label"]:
+            context += f" {spec['date_label']}"
+
+        metric = spec["metric"]
+
+        # "Top 5 customers by amount" / "Top 10 transactions"
+        if spec["top_n"]:
+            n = spec["top_n"]
+            if spec["top_target"]:
+                column = METRIC_COLUMNS.get(metric, 'Amount')
+                groups = selection.group_totals(spec["top_target"]).nlargest(n, column)
+                noun = TOP_NOUNS[spec["top_target"]]
+                response['text'] = f"**Top {len(groups)} {noun} by {column.lower()}**{context}:\n\n" + markdown_table(groups, column)
+                response['data'] = groups
+            else:
+                rows = selection.top_rows(n)
+                response['text'] = f"Here are the {len(rows)} largest transactions{context}."
+                response['data'] = rows
+            response['type'] = 'table'
+
+        # "Monthly totals for London in 2023" / "Count by branch"
+        elif spec["group_by"]:
+            column = METRIC_COLUMNS.get(metric, 'Amount')
+            groups = selection.group_totals(spec["group_by"])
+            title = f"**{GROUP_TITLES[spec['group_by']]} {'total amount' if column == 'Amount' else column.lower()}**{context}"
+            if len(groups) <= MAX_TABLE_ROWS:
+                response['text'] = f"{title}:\n\n" + markdown_table(groups, column, spec["group_by"])
+            else:
+                response['text'] = f"{title}: {len(groups)} groups (see table)."
+            response['data'] = groups
+            response['type'] = 'table'
+
+        # "How many transactions..."
+        elif metric == 'count':
+            count = selection.count()
+            response['text'] = f"There are **{count:,}** transactions{context}."
+            response['data'] = selection.daily_totals() if spec["chart"] else None
+            response['type'] = 'kpi'
 
-        filtered_df = self.df.copy()
-        
-        # --- 1. Entity Extraction (Simple Regex-based) ---
-        
-        # Detect Branch
-        # Assumes branches are single words or we have a list. 
-        # For this demo, we check if any known branch is in the query.
-        known_branches = self.df['Branch'].unique().tolist() if 'Branch' in self.df.columns else []
-        selected_branch = None
-        for branch in known_branches:
-            if branch.lower() in query:
-                filtered_df = filtered_df[filtered_df['Branch'].str.lower() == branch.lower()]
-                selected_branch = branch
-                break
-                
-        # Detect Transaction Type
-        known_types = self.df['Transaction_Type'].unique().tolist() if 'Transaction_Type' in self.df.columns else []
-        for t_type in known_types:
-            if t_type.lower() in query:
-                filtered_df = filtered_df[filtered_df['Transaction_Type'].str.lower() == t_type.lower()]
-                break
-
-        # --- 2. Calculation Logic ---
-        
         # "Total Amount" / "Sum"
-        if any(w in query for w in ['total', 'sum', 'how much']):
-            total_amt = filtered_df['Amount'].sum()
-            count = len(filtered_df)
-            
-            context = f" for {selected_branch}" if selected_branch else ""
+        elif metric == 'total':
+            total_amt = selection.sum()
+            count = selection.count()
             response['text'] = f"The **Total Transaction Amount**{context} is **${total_amt:,.2f}** over {count} transactions."
-            response['data'] = filtered_df
+            response['data'] = selection.daily_totals() if spec["chart"] else None
             response['type'] = 'kpi'
 
         # "Average"
-        elif 'average' in query:
-            avg_amt = filtered_df['Amount'].mean()
-            response['text'] = f"The **Average Transaction Amount** is **${avg_amt:,.2f}**."
-            response['data'] = filtered_df
+        elif metric == 'average':
+            avg_amt = selection.mean()
+            response['text'] = f"The **Average Transaction Amount**{context} is **${avg_amt:,.2f}**."
+            response['data'] = selection.daily_totals() if spec["chart"] else None
             response['type'] = 'kpi'
 
         # "List" / "Show" (Default)
         else:
             limit = 10  # Default limit
-            response['text'] = f"Here are the top {limit} transactions fitting your criteria."
-            response['data'] = filtered_df.head(limit)
+            response['text'] = f"Here are the top {limit} transactions fitting your criteria{context}."
+            response['data'] = selection.daily_totals() if spec["chart"] else selection.head(limit)
             response['type'] = 'table'
-            
+
         return response
@@ -0,0 +1,91 @@
+import os
+import json
+import argparse
+import threading
+from datetime import datetime
+import pandas as pd
+import config
+
+
+class AuditLog:
+    """
+    Append-only JSON Lines audit trail with size-based rotation.
+    Each event is a single line appended to the active file, so writes cost the
+    same after a day or a year of uptime. Rotated segments are kept as
+    .1 (newest) .. .N (oldest); export_xlsx() stitches them back together.
+    """
+    def __init__(self, path=None, max_bytes=None, backup_count=None):
+        self.path = path or config.AUDIT_FILE
+        self.max_bytes = max_bytes or config.AUDIT_MAX_BYTES
+        self.backup_count = config.AUDIT_BACKUP_COUNT if backup_count is None else backup_count
+        self._lock = threading.Lock()
+        self._migrate_legacy_xlsx()
+
+    def _migrate_legacy_xlsx(self):
+        """One-time import of the old rewrite-on-every-event supervisor_audit.xlsx."""
+        legacy = self.path.with_suffix(".xlsx")
+        if self.path.exists() or not legacy.exists():
+            return
+        try:
+            df = pd.read_excel(legacy)
+        except Exception as e:
+            config.logger.warning(f"Could not import legacy audit workbook {legacy}: {e}")
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            for record in df.astype(str).to_dict('records'):
+                f.write(json.dumps(record) + "\n")
+        config.logger.info(f"Imported {len(df)} legacy audit rows from {legacy.name}")
+
+    def segments(self):
+        """Audit files oldest first: .N .. .1, then the active file."""
+        rotated = [self.path.with_name(f"{self.path.name}.{i}") for i in range(self.backup_count, 0, -1)]
+        return [p for p in rotated + [self.path] if p.exists()]
+
+    def _rotate(self):
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backup_count > 0:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def write(self, event_type, script_name, details):
+        entry = {
+            "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "Event": event_type,
+            "Script": script_name,
+            "Details": details
+        }
+        line = json.dumps(entry) + "\n"
+        with self._lock:
+            if self.path.exists() and self.path.stat().st_size + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+    def read(self):
+        frames = [pd.read_json(p, lines=True, dtype=False, convert_dates=False) for p in self.segments() if p.stat().st_size]
+        if not frames:
+            return pd.DataFrame(columns=["Timestamp", "Event", "Script", "Details"])
+        return pd.concat(frames, ignore_index=True)
+
+    def export_xlsx(self, output_path=None):
+        """On-demand export of the whole audit trail (all segments) to Excel."""
+        output_path = output_path or self.path.with_name(self.path.stem + "_export.xlsx")
+        df = self.read()
+        df.to_excel(output_path, index=False)
+        print(f"📄 Exported {len(df)} audit events to {output_path}")
+        return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Supervisor audit trail")
+    parser.add_argument("--export", nargs="?", const="", metavar="XLSX",
+                        help="Export the audit trail to Excel (default: supervisor_audit_export.xlsx)")
+    args = parser.parse_args()
+    if args.export is not None:
+        AuditLog().export_xlsx(args.export or None)
+    else:
+        parser.print_help()
@@ -11,6 +11,53 @@ DB_PATH = BASE_DIR / "banking.db"
 # --- Database Settings ---
 TABLE_NAME = "banking_transactions"
 CHUNK_SIZE = 1000  # Number of rows to fetch per "chunk" (Interview Key Point)
+BULK_BATCH_ROWS = 50_000  # Rows per executemany batch in BulkLoader
+SQLITE_BUSY_TIMEOUT = 120  # Seconds a loader waits for another worker's write transaction
+
+# --- Processor Settings ---
+PROCESSOR_WORKERS = 1  # >1 enables the reader-thread + process-pool pipeline
+PROCESSOR_QUEUE_DEPTH = 4  # Max chunks buffered between the DB reader and the workers
+CLAIM_BATCH_FILES = 4  # Files a processor claims at a time; the rest stay in incoming/ for other workers
+DECODE_WORKERS = 4  # Processes decoding incoming files concurrently (1 = sequential)
+STREAM_MEMORY_LIMIT_MB = 256  # Ceiling for rows buffered by StreamingWriter before a forced flush
+STREAM_FLUSH_ROWS = 100_000  # Rows StreamingWriter buffers before writing a batch to every output (CSV, Parquet, rollups)
+
+# --- Daily Reports ---
+REPORT_ENGINE = "xlsxwriter"  # "xlsxwriter" (streaming, constant memory) or "openpyxl" (legacy)
+REPORT_WORKERS = 4  # Processes writing day files in parallel
+REPORT_PARALLEL_MIN_DAYS = 50  # Below this many days a batch is written in-process
+
+# --- Archive Packaging ---
+ARCHIVE_FORMAT = "zip"  # "zip" or "tar.zst" (needs the optional zstandard package)
+ARCHIVE_WEEKLY_COMPRESSION = "deflate"  # zip: "deflate", "stored", "bzip2" or "lzma"
+ARCHIVE_MONTHLY_COMPRESSION = "stored"  # Monthly archives nest already-compressed weeklies
+ARCHIVE_ZSTD_LEVEL = 3
+ARCHIVE_WORKERS = 4  # Threads building archives in parallel
+
+# --- Parquet Master Store ---
+PARQUET_STORE_ENABLED = False  # Also append cleaned rows to a year/month-partitioned Parquet store
+PARQUET_STORE_DIR = OUTPUT_DIR / "master_store"
+
+# --- Dashboard Rollups ---
+ROLLUP_DIR = OUTPUT_DIR / "rollups"  # Daily totals/counts per branch and type, plus KPIs
+
+# --- Assistant ---
+QUERY_CACHE_ENTRIES = 256  # Cached BankingAI answers (LRU)
+QUERY_CACHE_MB = 64  # Approximate memory ceiling for cached answers
+
+# --- Mock Data ---
+MOCK_SEED = None  # Set an int to make data_feeder months reproducible
+
+# --- Supervisor ---
+SUPERVISOR_MODE = "inprocess"  # "inprocess" (threads), "pool" (warm worker processes) or "subprocess" (isolated)
+SUPERVISOR_MAX_CONCURRENT = 2  # Jobs allowed to run at the same time
+SUPERVISOR_PROCESSOR_INSTANCES = 1  # Processor jobs draining incoming/ in parallel
+WATCH_DEBOUNCE_SECONDS = 2.0  # Watch mode: a file is complete once unchanged this long
+WATCH_MAX_BATCH_SECONDS = 30.0  # Watch mode: never hold a ready file longer than this while a burst continues
+WATCH_POLL_SECONDS = 1.0  # Watch mode: how often arrivals are checked
+AUDIT_FILE = OUTPUT_DIR / "supervisor_audit.jsonl"  # Append-only audit trail (export to xlsx with audit_log.py --export)
+AUDIT_MAX_BYTES = 10 * 1024 * 1024  # Rotate the audit file past this size
+AUDIT_BACKUP_COUNT = 10  # Rotated audit files kept
 
 # Ensure directories exist BEFORE logging setup
 RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
@@ -1,10 +1,10 @@
-import pandas as pd
 import numpy as np
 import config
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
 import os
 import json
+from file_handoff import publish
+from mock_data_gen import generate_frame
 
 # --- Configuration ---
 STATE_FILE = config.OUTPUT_DIR / "feeder_state.json"
@@ -53,45 +53,22 @@ def generate_chunk():
     config.logger.info(f"Data Feeder: Generating data for {current_date.strftime('%Y-%m')}")
     print(f"Feeder: Producing data for {current_date.strftime('%B %Y')}...")
 
-    # Generate random dates within the current month
-    days_in_month = (next_date - current_date).days
-    
-    random_days = np.random.randint(0, days_in_month, ROWS_PER_MONTH)
-    random_seconds = np.random.randint(0, 86400, ROWS_PER_MONTH)
-    
-    dates = []
-    for d, s in zip(random_days, random_seconds):
-        dates.append(current_date + timedelta(days=int(d), seconds=int(s)))
-    
-    dates.sort() # Sort by date for realism
-
-    # Other mocked columns
-    ids = np.arange(1000, 1000 + ROWS_PER_MONTH) # IDs ideally should strictly increase if global, but for mock per file it's okay maybe? 
-    # Better: Use timestamp-based IDs or something unique.
-    # Let's use a random offset + row index to ensure some uniqueness if files are merged
+    # Vectorized generation (see mock_data_gen); seeded per month when MOCK_SEED is set
+    seed = None if config.MOCK_SEED is None else [config.MOCK_SEED, int(current_date.strftime('%Y%m'))]
+    rng = np.random.default_rng(seed)
+    # Timestamp-based IDs keep rows unique when monthly files are merged
     base_id = int(current_date.timestamp())
-    ids = [base_id + i for i in range(ROWS_PER_MONTH)]
-
-    amounts = np.round(np.random.uniform(-100, 10000, ROWS_PER_MONTH), 2)
-    branches = ['New York', 'London', 'Mumbai', 'Singapore', 'Tokyo']
-    types = ['Credit', 'Debit', 'Transfer']
-    customers = [f"Customer_{random.randint(1, 1000)}" for _ in range(ROWS_PER_MONTH)]
-
-    df = pd.DataFrame({
-        'Transaction_ID': ids,
-        'Transaction_Date': dates,
-        'Amount': amounts,
-        'Branch': [random.choice(branches) for _ in range(ROWS_PER_MONTH)],
-        'Transaction_Type': [random.choice(types) for _ in range(ROWS_PER_MONTH)],
-        'Customer_Name': customers
-    })
+    df = generate_frame(rng, ROWS_PER_MONTH, current_date, next_date, id_start=base_id,
+                        sort_dates=True) # Sort by date for realism
 
     # Save to Incoming Folder
     incoming_dir = config.RAW_DATA_DIR / "incoming"
     incoming_dir.mkdir(parents=True, exist_ok=True)
     
     filename = incoming_dir / f"Bank_Data_{current_date.strftime('%Y-%m')}.xlsx"
-    df.to_excel(filename, index=False)
+    # Write under a temp name and rename, so the processor never sees a half-written file
+    with publish(filename) as tmp_path:
+        df.to_excel(tmp_path, index=False, engine="openpyxl")
     
     config.logger.info(f"Data Feeder: Saved {filename}")
     
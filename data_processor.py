@@ -1,15 +1,24 @@
 import pandas as pd
-import sqlite3
 import config
-import glob
 import os
 import json
 import shutil
+import argparse
+import queue
+import threading
+from collections import deque
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
 from db_connector import BankingDatabase
+from bulk_loader import BulkLoader
+from incoming_reader import iter_decoded_files, list_incoming, sort_by_arrival
+from incoming_watcher import IncomingWatcher
+from file_handoff import FileClaim, release_claim, recover_stale_claims, process_lock
 from validators import validate_chunk
 from cleaners import clean_data
 from reporter import Reporter
-from excel_generator import ExcelGenerator
+from stream_writer import StreamingWriter
+from parquet_store import ParquetMasterStore
 from temporal_packager import TemporalPackager
 
 # --- Configuration ---
@@ -19,104 +28,221 @@ def load_state():
     if PROCESSOR_STATE_FILE.exists():
         with open(PROCESSOR_STATE_FILE, 'r') as f:
             return json.load(f)
-    return {"last_processed_offset": 0}
+    return {"last_processed_rowid": 0}
 
-def save_state(offset):
-    with open(PROCESSOR_STATE_FILE, 'w') as f:
-        json.dump({"last_processed_offset": offset}, f)
+def save_state(rowid, dirty_days=()):
+    """
+    Checkpoint: every row up to rowid is in all master outputs; dirty_days are
+    days whose reports still have to be regenerated (picked up after a crash).
+    """
+    tmp_file = PROCESSOR_STATE_FILE.with_name(PROCESSOR_STATE_FILE.name + ".tmp")
+    with open(tmp_file, 'w') as f:
+        json.dump({"last_processed_rowid": rowid,
+                   "dirty_days": sorted(day.isoformat() for day in dirty_days)}, f)
+    os.replace(tmp_file, PROCESSOR_STATE_FILE)
 
-def ingest_new_files():
-    """Ingests files from incoming/ to DB and moves them to processed/."""
+def resolve_start_key(state, db):
+    """Returns the last processed rowid, migrating legacy offset-based state."""
+    if "last_processed_rowid" in state:
+        return state["last_processed_rowid"]
+    return db.rowid_at_offset(state.get("last_processed_offset", 0))
+
+def ingest_new_files(decode_workers=None):
+    """
+    Ingests files from incoming/ to DB and moves them to processed/.
+    Files are claimed a small batch at a time (see file_handoff), so several
+    processors can drain incoming/ at once without loading a file twice and
+    without one of them taking the whole backlog.
+    """
     incoming_dir = config.RAW_DATA_DIR / "incoming"
     processed_dir = config.RAW_DATA_DIR / "processed"
     processed_dir.mkdir(parents=True, exist_ok=True)
     
-    files = glob.glob(str(incoming_dir / "*.xlsx"))
-    if not files:
-        return 0 # No new files
-
+    recover_stale_claims()
     count = 0
-    conn = sqlite3.connect(config.DB_PATH)
+    failed = set() # Released back to incoming/; left for the next run
+    loader = BulkLoader()
     
-    for f in files:
-        try:
-            config.logger.info(f"Processor: Ingesting {f}...")
-            df = pd.read_excel(f)
-            # Basic clean of columns
-            df.columns = [c.strip().replace(" ", "_") for c in df.columns]
-            
-            # Append to DB
-            df.to_sql(config.TABLE_NAME, conn, if_exists='append', index=False)
+    with FileClaim() as claim:
+        while True:
+            pending = [p for p in sort_by_arrival(list_incoming(incoming_dir)) if p.name not in failed]
+            files = claim.take(pending, config.CLAIM_BATCH_FILES)
+            if not files:
+                break
             
-            # Move to processed
-            shutil.move(f, processed_dir / os.path.basename(f))
-            count += 1
-        except Exception as e:
-            config.logger.error(f"Failed to ingest {f}: {e}")
+            # Files are decoded concurrently but loaded one at a time, in arrival order
+            for f, frames, error in iter_decoded_files(files, workers=decode_workers):
+                if error is not None:
+                    failed.add(release_claim(f).name) # Already logged
+                    continue
+                try:
+                    config.logger.info(f"Processor: Ingesting {f}...")
+                    
+                    # Append to DB (one transaction per file, however many chunks)
+                    loader.load_chunks(frames)
+                    
+                    # Move to processed
+                    shutil.move(f, processed_dir / os.path.basename(f))
+                    count += 1
+                except Exception as e:
+                    config.logger.error(f"Failed to ingest {f}: {e}")
+                    failed.add(release_claim(f).name)
             
-    conn.close()
+    loader.close()
     return count
 
-def process_new_data():
+def validate_and_clean(df_chunk):
+    """Validates and cleans one chunk. Top-level so worker processes can pickle it."""
+    valid_df, invalid_df, report = validate_chunk(df_chunk)
+    clean_df = clean_data(valid_df) if not valid_df.empty else pd.DataFrame()
+    return clean_df, invalid_df, report
+
+_READER_DONE = object()
+
+def _read_chunks(db, start_key, max_key, chunk_queue, stop):
+    """Reader thread: streams keyset chunks from the DB into a bounded queue until told to stop."""
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunk_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    chunks = db.iter_chunks(after_rowid=start_key, upto_rowid=max_key)
+    try:
+        for item in chunks:
+            if not put(item):
+                break
+    except Exception as e:
+        put(e)
+    finally:
+        chunks.close()  # Closes the reader's sqlite connection
+        put(_READER_DONE)
+
+def iter_processed_chunks(db, start_key, max_key, workers=1, queue_depth=None):
+    """
+    Yields (chunk_key, clean_df, invalid_df, report) in rowid order.
+    With workers > 1, a reader thread fills a bounded queue while a process pool
+    validates/cleans, and results are handed back in submission order.
+    If the consumer stops early (an exception or close()), the reader thread is
+    stopped and joined, so no thread or DB connection outlives the generator.
+    """
+    if workers <= 1:
+        chunks = db.iter_chunks(after_rowid=start_key, upto_rowid=max_key)
+        try:
+            for chunk_key, df_chunk in chunks:
+                yield (chunk_key, *validate_and_clean(df_chunk))
+        finally:
+            chunks.close()
+        return
+
+    chunk_queue = queue.Queue(maxsize=queue_depth or config.PROCESSOR_QUEUE_DEPTH)
+    stop = threading.Event()
+    reader = threading.Thread(
+        target=_read_chunks, args=(db, start_key, max_key, chunk_queue, stop), daemon=True
+    )
+    reader.start()
+
+    pending = deque()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                item = chunk_queue.get()
+                if item is _READER_DONE:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+
+                chunk_key, df_chunk = item
+                pending.append((chunk_key, pool.submit(validate_and_clean, df_chunk)))
+
+                # Ordered writer: emit the oldest chunk once the pool is saturated
+                while len(pending) > workers:
+                    chunk_key, future = pending.popleft()
+                    yield (chunk_key, *future.result())
+
+            while pending:
+                chunk_key, future = pending.popleft()
+                yield (chunk_key, *future.result())
+    finally:
+        for _, future in pending:
+            future.cancel()
+        stop.set()
+        # Unblock a reader waiting on a full queue, then wait for it to exit
+        while reader.is_alive():
+            try:
+                chunk_queue.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        reader.join()
+
+def process_new_data(workers=None, queue_depth=None, memory_limit_mb=None, decode_workers=None):
     """Processes only new rows from the DB."""
     # 1. Ingest any waiting files
-    ingested_count = ingest_new_files()
+    ingested_count = ingest_new_files(decode_workers=decode_workers)
     if ingested_count > 0:
         config.logger.info(f"Processor: Ingested {ingested_count} new files.")
 
-    # 2. Setup processing
-    state = load_state()
-    start_offset = state["last_processed_offset"]
-    
+    # 2. Only one worker turns DB rows into clean output at a time
+    with process_lock() as acquired:
+        if not acquired:
+            print("⏭️  Another processor is cleaning new rows; this batch will be picked up by it or the next run.")
+            return
+        _process_db_rows(workers, queue_depth, memory_limit_mb)
+
+def _process_db_rows(workers, queue_depth, memory_limit_mb):
+    """Validates, cleans and writes every DB row past the saved rowid."""
     db = BankingDatabase()
     reporter = Reporter()
+
+    state = load_state()
+    start_key = resolve_start_key(state, db)
+    max_key = db.get_max_rowid()
+    # Days an interrupted run wrote rows for but never regenerated
+    pending_days = {date.fromisoformat(day) for day in state.get("dirty_days", [])}
     
-    total_rows = db.get_total_count()
-    
-    if start_offset >= total_rows:
+    if start_key >= max_key and not pending_days:
         print("💤 No new rows to process.")
         return
 
-    print(f"Processing new rows: {start_offset} to {total_rows}...")
+    workers = workers or config.PROCESSOR_WORKERS
+    if start_key < max_key:
+        print(f"Processing new rows: rowid {start_key} to {max_key} ({workers} worker(s))...")
+    else:
+        print(f"Regenerating {len(pending_days)} report day(s) left by an interrupted run...")
     
-    processed_count = start_offset
-    new_clean_data = []
-
-    # 3. Process Chunk Loop
-    while processed_count < total_rows:
-        df_chunk = db.fetch_chunk(offset=processed_count, limit=config.CHUNK_SIZE)
-        if df_chunk.empty:
-            break
+    last_key = start_key
+    store = ParquetMasterStore() if config.PARQUET_STORE_ENABLED else None
+    writer = StreamingWriter(memory_limit_mb=memory_limit_mb, parquet_store=store)
+    writer.dirty_days.update(pending_days)
+
+    # 3. Process Chunk Loop (keyset paging over one connection)
+    chunks = iter_processed_chunks(db, start_key, max_key, workers=workers, queue_depth=queue_depth)
+    try:
+        for chunk_key, clean_df, invalid_df, report in chunks:
+            # Record validation results
+            reporter.update_stats(report)
+            reporter.log_discards(invalid_df)
             
-        # Validate
-        valid_df, invalid_df, report = validate_chunk(df_chunk)
-        reporter.update_stats(report)
-        reporter.log_discards(invalid_df)
-        
-        # Clean
-        if not valid_df.empty:
-            clean_df = clean_data(valid_df)
-            new_clean_data.append(clean_df)
-        
-        processed_count += len(df_chunk)
-
-    # 4. Save Results (Append)
-    if new_clean_data:
-        final_df = pd.concat(new_clean_data, ignore_index=True)
-        
-        # Append to Master CSV
-        final_output_path = config.OUTPUT_DIR / "master_clean_data.csv"
-        header = not final_output_path.exists()
-        final_df.to_csv(final_output_path, mode='a', header=header, index=False)
-        print(f"💾 Appended {len(final_df)} rows to Master Clean Data.")
-
-        # Generate Reports (Only for this batch)
-        # Note: Excel Generator creates daily files. We can just pass the new data.
-        # Ideally, we should merge with existing daily data if partial, 
-        # but for now we assume chunks align or overwriting daily files for the same day is acceptable
-        # OR we just generate reports for the new data.
-        excel_gen = ExcelGenerator(final_df)
-        excel_gen.generate_daily_files()
+            # Cleaned rows are buffered and written to the Master CSV, Parquet store and
+            # rollups together. Checkpoint only after such a flush, so a crash replays
+            # the unflushed chunks instead of losing them from some outputs.
+            last_key = chunk_key
+            if writer.write(clean_df):
+                save_state(last_key, writer.dirty_days)
+    finally:
+        chunks.close()  # Stops the reader thread if we bailed out early
+
+    writer.flush()
+    save_state(last_key, writer.dirty_days)
+    writer.close()  # Regenerates the dirty days
+    save_state(last_key)
+
+    # 4. Archive what was written
+    if writer.rows_written or pending_days:
+        print(f"💾 Appended {writer.rows_written} rows to Master Clean Data.")
 
         # Archive (Triggered periodically or here?)
         # Let's run it here to be safe
@@ -125,9 +251,39 @@ def process_new_data():
     
     reporter.save_summary() # Resets/Updates summary stats
     
-    # 5. Update State
-    save_state(processed_count)
-    print(f"✅ Batch Complete. Next offset: {processed_count}")
+    print(f"✅ Batch Complete. Last processed rowid: {last_key}")
+
+def watch_incoming(**process_kwargs):
+    """
+    Watch mode: runs ingest + processing as soon as a batch of incoming files
+    is fully written, instead of on a fixed interval.
+    """
+    watcher = IncomingWatcher()
+    print(f"👀 Watching {watcher.directory} ({watcher.backend}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            batch = watcher.wait_for_batch()
+            config.logger.info(f"Watch: {len(batch)} new file(s) ready, processing")
+            process_new_data(**process_kwargs)
+    except KeyboardInterrupt:
+        print("\n🛑 Watch stopped by user.")
+    finally:
+        watcher.stop()
+
 
 if __name__ == "__main__":
-    process_new_data()
+    parser = argparse.ArgumentParser(description="Validate and clean new rows from the banking DB")
+    parser.add_argument("--workers", "-w", type=int, default=config.PROCESSOR_WORKERS,
+                        help="Worker processes for validate+clean (1 = serial)")
+    parser.add_argument("--queue-depth", type=int, default=config.PROCESSOR_QUEUE_DEPTH,
+                        help="Max chunks buffered between the DB reader and the workers")
+    parser.add_argument("--memory-limit-mb", type=int, default=config.STREAM_MEMORY_LIMIT_MB,
+                        help="Ceiling for cleaned rows buffered in memory before a forced flush")
+    parser.add_argument("--decode-workers", type=int, default=config.DECODE_WORKERS,
+                        help="Processes decoding incoming files concurrently (1 = sequential)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and process files as soon as they land in incoming/")
+    args = parser.parse_args()
+    run = watch_incoming if args.watch else process_new_data
+    run(workers=args.workers, queue_depth=args.queue_depth,
+        memory_limit_mb=args.memory_limit_mb, decode_workers=args.decode_workers)
@@ -0,0 +1,90 @@
+import os
+import json
+from datetime import date, timedelta
+import config
+
+
+def week_label(day):
+    """ISO week label for a date, e.g. 2024-12-30 -> '2025-W01'."""
+    iso_year, iso_week, _ = day.isocalendar()
+    return f"{iso_year}-W{iso_week:02d}"
+
+
+def month_of_week_label(week):
+    """
+    Month a week belongs to: the month containing its Thursday (the ISO rule),
+    so every week lands in exactly one month.
+    """
+    year, week_num = week.split("-W")
+    thursday = date.fromisocalendar(int(year), int(week_num), 4)
+    return f"{thursday.year}-{thursday.month:02d}"
+
+
+class DateIndex:
+    """
+    Precomputed calendar buckets for the data range: day -> ISO week -> month.
+    Built once, extended when new days show up, and persisted so that
+    ExcelGenerator and TemporalPackager agree on membership without
+    re-deriving it from folder or file names on every run.
+    """
+    def __init__(self, path=None):
+        self.path = path or config.OUTPUT_DIR / "date_index.json"
+        self.start = None
+        self.end = None
+        self.day_to_week = {}
+        self.week_to_month = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path=None):
+        index = cls(path)
+        if index.path.exists():
+            with open(index.path, 'r') as f:
+                data = json.load(f)
+            index.week_to_month = data["weeks"]
+            index._fill(date.fromisoformat(data["start"]), date.fromisoformat(data["end"]))
+        return index
+
+    def _fill(self, start, end):
+        day = start
+        while day <= end:
+            if day not in self.day_to_week:
+                week = week_label(day)
+                self.day_to_week[day] = week
+                if week not in self.week_to_month:
+                    self.week_to_month[week] = month_of_week_label(week)
+            day += timedelta(days=1)
+        self.start = start if self.start is None else min(self.start, start)
+        self.end = end if self.end is None else max(self.end, end)
+
+    def extend(self, start, end):
+        """Make sure every day in [start, end] is indexed."""
+        if self.start is not None and self.start <= start and end <= self.end:
+            return
+        self._fill(start, end)
+        self._dirty = True
+
+    def week_of(self, day):
+        if day not in self.day_to_week:
+            self.extend(day, day)
+        return self.day_to_week[day]
+
+    def month_of_week(self, week):
+        """Month label for a week; unindexed (e.g. legacy) labels are computed on the fly."""
+        month = self.week_to_month.get(week)
+        if month is None:
+            month = month_of_week_label(week)
+        return month
+
+    def weeks_in_month(self, month):
+        return sorted(w for w, m in self.week_to_month.items() if m == month)
+
+    def save(self):
+        if not self._dirty or self.start is None:
+            return
+        data = {"start": self.start.isoformat(), "end": self.end.isoformat(), "weeks": self.week_to_month}
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
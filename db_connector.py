@@ -24,6 +24,32 @@ class BankingDatabase:
         conn.close()
         return count
 
+    def get_max_rowid(self):
+        """Get the highest rowid currently in the table (0 if empty)."""
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT MAX(rowid) FROM {config.TABLE_NAME}")
+        max_rowid = cursor.fetchone()[0]
+        conn.close()
+        return max_rowid or 0
+
+    def rowid_at_offset(self, offset):
+        """
+        Translate a legacy row offset into the rowid of the last row before it.
+        Used once to migrate old offset-based processor state to keyset state.
+        """
+        if offset <= 0:
+            return 0
+        conn = self.connect()
+        cursor = conn.cursor()
+        cursor.execute(
+            f"SELECT rowid FROM {config.TABLE_NAME} ORDER BY rowid LIMIT 1 OFFSET ?",
+            (offset - 1,)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else self.get_max_rowid()
+
     def fetch_chunk(self, offset, limit):
         """
         Fetch a specific chunk of data.
@@ -39,3 +65,37 @@ class BankingDatabase:
             return pd.DataFrame() # Return empty on error
         finally:
             conn.close()
+
+    def iter_chunks(self, after_rowid=0, limit=None, upto_rowid=None):
+        """
+        Stream the table in rowid order over one connection.
+        Keyset paging (WHERE rowid > last_key) keeps every chunk the same cost
+        no matter how deep into the table we are, unlike LIMIT/OFFSET.
+        Yields (last_rowid, df) so callers can checkpoint after each chunk.
+        """
+        limit = limit or config.CHUNK_SIZE
+        query = f"SELECT rowid AS _rowid, * FROM {config.TABLE_NAME} WHERE rowid > ?"
+        bounds = []
+        if upto_rowid is not None:
+            # Snapshot bound so rows appended mid-run wait for the next batch
+            query += " AND rowid <= ?"
+            bounds.append(upto_rowid)
+        query += " ORDER BY rowid LIMIT ?"
+
+        conn = self.connect()
+        try:
+            last_rowid = after_rowid
+            while True:
+                try:
+                    df = pd.read_sql_query(query, conn, params=[last_rowid] + bounds + [limit])
+                except Exception as e:
+                    config.logger.error(f"Error fetching chunk (After rowid: {last_rowid}): {e}")
+                    return
+                if df.empty:
+                    return
+                last_rowid = int(df['_rowid'].iloc[-1])
+                yield last_rowid, df.drop(columns=['_rowid'])
+                if len(df) < limit:
+                    return
+        finally:
+            conn.close()
@@ -1,36 +1,127 @@
 import pandas as pd
 import config
 import os
+import time
+import tempfile
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from pathlib import Path
+from report_manifest import ReportManifest, migrate_week_folders
+from date_index import DateIndex
+
+
+def write_day_openpyxl(filepath, group):
+    """Original writer: builds the whole workbook in memory via openpyxl."""
+    with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        group.to_excel(writer, index=False, sheet_name="Transactions")
+
+
+def write_day_xlsxwriter(filepath, group):
+    """
+    Streams one day's rows with xlsxwriter in constant_memory mode: each row
+    is flushed to disk as soon as it is written, so memory does not grow with
+    the sheet. Top-level so worker processes can pickle it.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(str(filepath), {
+        'constant_memory': True,
+        'remove_timezone': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm:ss',
+    })
+    sheet = workbook.add_worksheet("Transactions")
+    sheet.write_row(0, 0, [str(c) for c in group.columns])
+
+    # Plain Python values, column by column; NaN/NaT become blank cells
+    columns = []
+    for c in group.columns:
+        col = group[c]
+        if col.isna().any():
+            col = col.astype(object).where(col.notna(), None)
+        columns.append(col.tolist())
+    for r, row in enumerate(zip(*columns), start=1):
+        sheet.write_row(r, 0, row)
+    workbook.close()
+
+
+WRITERS = {
+    'openpyxl': write_day_openpyxl,
+    'xlsxwriter': write_day_xlsxwriter,
+}
+
+
+def _write_day(job):
+    engine, filepath, group = job
+    WRITERS[engine](filepath, group)
+
 
 class ExcelGenerator:
-    def __init__(self, df):
+    def __init__(self, df, output_dir=None):
         self.df = df
-        self.output_dir = config.OUTPUT_DIR / "daily_reports"
+        self.output_dir = output_dir or config.OUTPUT_DIR / "daily_reports"
         self.output_dir.mkdir(exist_ok=True)
 
-    def generate_daily_files(self):
+    def generate_daily_files(self, engine=None, workers=None, manifest=None):
         """
         Splits the dataframe by date and saves individual Excel files.
-        Files are organized into weekly folders: YYYY-WNN/
+        Files are organized into ISO weekly folders: YYYY-WNN/
+        Large backfills are fanned out across a process pool.
+        With a manifest, days whose rows are unchanged since the last write are skipped.
         """
+        engine = engine or config.REPORT_ENGINE
+        workers = workers or config.REPORT_WORKERS
         config.logger.info("Starting Daily Excel Generation...")
         
         # Ensure we have a datetime column
         if 'Transaction_Date' not in self.df.columns:
             config.logger.error("Transaction_Date column missing. Cannot generate daily reports.")
-            return
+            return 0
+
+        jobs, skipped = self.plan_daily_files(engine, manifest)
+
+        # A pool only pays for itself on backfills; small batches stay in-process
+        if workers > 1 and len(jobs) >= config.REPORT_PARALLEL_MIN_DAYS:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(_write_day, jobs, chunksize=8))
+        else:
+            for job in jobs:
+                _write_day(job)
 
+        if manifest is not None:
+            manifest.save()
+
+        count = len(jobs)
+        config.logger.info(f"Generated {count} daily Excel files in weekly folders ({skipped} unchanged, skipped)")
+        print(f"📊 Generated {count} daily Excel files (organized by week).")
+        return count
+
+    def plan_daily_files(self, engine, manifest=None):
+        """
+        Returns ([(engine, filepath, rows)] for every day that needs writing, number
+        of unchanged days skipped). Creates the week folders and records the jobs
+        in the manifest; the caller writes the files and saves the manifest.
+        """
         # Ensure datetime type
         self.df['Transaction_Date'] = pd.to_datetime(self.df['Transaction_Date'])
 
         # Group by Date (YYYY-MM-DD)
         daily_groups = self.df.groupby(self.df['Transaction_Date'].dt.date)
 
-        count = 0
+        # Reports written by older versions still sit in %W folders
+        migrate_week_folders(self.output_dir, manifest)
+
+        # Shared day -> ISO week index (also used by TemporalPackager)
+        index = DateIndex.load()
+        if daily_groups.ngroups:
+            days = list(daily_groups.groups.keys())
+            index.extend(min(days), max(days))
+
+        jobs = []
+        skipped = 0
         for date_val, group in daily_groups:
             # Get week number (ISO format: YYYY-WNN)
-            week_str = date_val.strftime("%Y-W%W")
+            week_str = index.week_of(date_val)
             
             # Create weekly folder
             week_dir = self.output_dir / week_str
@@ -40,12 +131,116 @@ class ExcelGenerator:
             date_str = date_val.strftime("%Y-%m-%d")
             filename = f"Bank_Report_{date_str}.xlsx"
             filepath = week_dir / filename
-            
-            # Write to Excel
-            with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
-                group.to_excel(writer, index=False, sheet_name="Transactions")
-                
-            count += 1
-            
-        config.logger.info(f"Generated {count} daily Excel files in weekly folders")
-        print(f"📊 Generated {count} daily Excel files (organized by week).")
+
+            if manifest is not None:
+                digest = manifest.content_hash(group)
+                if manifest.is_current(date_str, filepath, len(group), digest):
+                    skipped += 1
+                    continue
+                manifest.remove_stale_file(date_str, filepath)
+                manifest.record(date_str, filepath, len(group), digest)
+            jobs.append((engine, filepath, group))
+
+        index.save()
+        return jobs, skipped
+
+
+def regenerate_days(days, read_range, engine=None, workers=None):
+    """
+    Rebuilds the daily reports for the given dates from the master store.
+    `read_range(start, end)` returns every master row in that inclusive date
+    range, so each day is written with all of its rows, not just a batch's.
+    Days are read one month at a time to bound memory; the manifest skips
+    days whose content hasn't changed. Whether to use the process pool is
+    decided from the total number of days, and one pool writes every month:
+    the next month is read while the previous one is written.
+    """
+    engine = engine or config.REPORT_ENGINE
+    workers = workers or config.REPORT_WORKERS
+    days = sorted(set(days))
+    if not days:
+        return 0
+
+    manifest = ReportManifest()
+    months = {}
+    for day in days:
+        months.setdefault((day.year, day.month), []).append(day)
+
+    pool = None
+    if workers > 1 and len(days) >= config.REPORT_PARALLEL_MIN_DAYS:
+        pool = ProcessPoolExecutor(max_workers=workers)
+
+    count = 0
+    skipped = 0
+    in_flight = []  # Write futures of the previous month
+    try:
+        for month_days in months.values():
+            df = read_range(month_days[0], month_days[-1])
+            if df is None or df.empty:
+                continue
+            df['Transaction_Date'] = pd.to_datetime(df['Transaction_Date'])
+            df = df[df['Transaction_Date'].dt.date.isin(month_days)].reset_index(drop=True)
+            jobs, unchanged = ExcelGenerator(df).plan_daily_files(engine, manifest)
+            count += len(jobs)
+            skipped += unchanged
+
+            if pool is None:
+                for job in jobs:
+                    _write_day(job)
+                continue
+            # At most two months of rows are held: the one being written and this one
+            submitted = [pool.submit(_write_day, job) for job in jobs]
+            for future in in_flight:
+                future.result()
+            in_flight = submitted
+
+        for future in in_flight:
+            future.result()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    manifest.save()
+    config.logger.info(f"Regenerated {count} daily Excel files ({skipped} unchanged, skipped)")
+    print(f"📊 Generated {count} daily Excel files (organized by week).")
+    return count
+
+
+def benchmark(days=365, rows_per_day=50, workers=None):
+    """Compare files/sec of the original openpyxl writer against xlsxwriter (serial and pooled)."""
+    workers = workers or config.REPORT_WORKERS
+    n = days * rows_per_day
+    df = pd.DataFrame({
+        'Transaction_ID': range(n),
+        'Transaction_Date': pd.date_range('2020-01-01', periods=n, freq=pd.Timedelta(days=1) / rows_per_day),
+        'Amount': [round(i * 1.37 % 10000, 2) for i in range(n)],
+        'Branch': ['London', 'Tokyo', 'Mumbai', 'New York', 'Singapore'] * (n // 5) + ['London'] * (n % 5),
+        'Transaction_Type': 'Credit',
+        'Customer_Name': [f"Customer_{i % 1000}" for i in range(n)],
+    })
+
+    results = {}
+    for label, engine, pool_size in [("openpyxl (current)", 'openpyxl', 1),
+                                      ("xlsxwriter", 'xlsxwriter', 1),
+                                      (f"xlsxwriter x{workers}", 'xlsxwriter', workers)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            gen = ExcelGenerator(df.copy(), output_dir=Path(tmp))
+            start = time.perf_counter()
+            count = gen.generate_daily_files(engine=engine, workers=pool_size)
+            elapsed = time.perf_counter() - start
+        results[label] = count / elapsed
+        print(f"⏱️  {label:<20} {count} files in {elapsed:.2f}s ({count / elapsed:,.1f} files/sec)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Daily Excel report generator")
+    parser.add_argument("--benchmark", action="store_true", help="Compare files/sec across writers")
+    parser.add_argument("--days", type=int, default=365, help="Days of synthetic data for --benchmark")
+    parser.add_argument("--rows-per-day", type=int, default=50, help="Rows per day for --benchmark")
+    parser.add_argument("--workers", type=int, default=config.REPORT_WORKERS, help="Pool size for --benchmark")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(days=args.days, rows_per_day=args.rows_per_day, workers=args.workers)
+    else:
+        parser.print_help()
@@ -0,0 +1,216 @@
+import os
+import uuid
+from contextlib import contextmanager
+import config
+
+# Producer -> consumer protocol for raw_data/incoming/:
+# 1. The feeder writes "<name>.part" (no reader handles that suffix) and renames it
+#    to "<name>" when complete, so a file in incoming/ is always fully written.
+# 2. A processor run opens a claim, claimed/<pid>-<token>/, and holds an OS lock on
+#    its .lock file for as long as the run lives. It claims a few files at a time by
+#    renaming them into that directory. Renames are atomic, so exactly one worker
+#    wins each file; the losers see it vanish.
+# 3. After loading, the claim moves to processed/; on failure it goes back to incoming/.
+#    A claim directory whose lock can be taken belongs to a finished or dead run,
+#    so its files are returned to incoming/.
+
+INCOMING_DIR = config.RAW_DATA_DIR / "incoming"
+CLAIMED_DIR = config.RAW_DATA_DIR / "claimed"
+CLAIM_LOCK_NAME = ".lock"
+PROCESS_LOCK_FILE = config.OUTPUT_DIR / "processor.lock"
+
+
+@contextmanager
+def publish(final_path):
+    """
+    Yields a temporary path next to final_path; when the block succeeds the file is
+    atomically renamed into place, otherwise the partial file is removed.
+    """
+    tmp_path = final_path.with_name(final_path.name + ".part")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, final_path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+
+
+def _try_lock(fh):
+    """Takes a non-blocking exclusive lock on an open file. Returns False if someone else holds it."""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(fh):
+    if os.name == 'nt':
+        import msvcrt
+        fh.seek(0)
+        msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+def release_claim(path):
+    """
+    Returns a claimed file to incoming/ so a later run retries it. A file of the
+    same name that arrived meanwhile is kept: the returned one gets a unique name.
+    Returns the file's new path.
+    """
+    target = INCOMING_DIR / path.name
+    while True:
+        try:
+            os.link(path, target)  # Unlike a rename, never replaces an existing file
+            break
+        except FileExistsError:
+            base, dot, ext = path.name.partition(".")
+            target = INCOMING_DIR / f"{base}-{uuid.uuid4().hex[:8]}{dot}{ext}"
+    os.unlink(path)
+    return target
+
+
+def _return_files(claim_dir):
+    """Moves every claimed file in a directory back to incoming/. Returns how many moved."""
+    returned = 0
+    for path in claim_dir.iterdir():
+        if path.name == CLAIM_LOCK_NAME:
+            continue
+        try:
+            release_claim(path)
+            returned += 1
+        except FileNotFoundError:
+            pass  # Another worker is recovering the same directory
+    return returned
+
+
+class FileClaim:
+    """
+    One processor run's claim on incoming files (see the protocol above). Use
+    as a context manager: on exit any files still claimed go back to incoming/.
+    """
+    def __init__(self):
+        self.dir = None
+        self._lock = None
+
+    def open(self):
+        """Creates this run's claim directory and locks it for the run's lifetime."""
+        while True:
+            claim_dir = CLAIMED_DIR / f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+            claim_dir.mkdir(parents=True)
+            lock_path = claim_dir / CLAIM_LOCK_NAME
+            try:
+                fh = open(lock_path, 'a+')
+            except FileNotFoundError:
+                continue  # Recovered as empty before we could lock it
+            # recover_stale_claims may have taken the lock (and deleted the file)
+            # between our open and our lock; then start over under a new name
+            if _try_lock(fh):
+                try:
+                    if os.path.samestat(os.fstat(fh.fileno()), os.stat(lock_path)):
+                        self.dir, self._lock = claim_dir, fh
+                        return self
+                except FileNotFoundError:
+                    pass
+                _unlock(fh)
+            fh.close()
+
+    def take(self, paths, limit):
+        """Claims up to `limit` of the given files, in order. Returns the claimed paths."""
+        claimed = []
+        for path in paths:
+            if len(claimed) >= limit:
+                break
+            target = self.dir / path.name
+            try:
+                os.replace(path, target)
+            except FileNotFoundError:
+                continue  # Another worker claimed it first
+            claimed.append(target)
+        return claimed
+
+    def close(self):
+        """Returns leftover files to incoming/ and removes the claim directory."""
+        if self.dir is None:
+            return
+        returned = _return_files(self.dir)
+        if returned:
+            config.logger.warning(f"Returned {returned} unfinished claimed file(s) to incoming/")
+        _unlock(self._lock)
+        self._lock.close()
+        _remove_claim_dir(self.dir)
+        self.dir = self._lock = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _remove_claim_dir(claim_dir):
+    try:
+        (claim_dir / CLAIM_LOCK_NAME).unlink(missing_ok=True)
+        claim_dir.rmdir()
+    except OSError:
+        pass  # Still in use (e.g. the lock file is open on Windows) or not empty
+
+
+def recover_stale_claims():
+    """
+    Moves files of claims whose run has ended (crashed, or finished without
+    returning them) back to incoming/. A live run holds its claim's lock, so
+    only claims nobody holds are touched, including ones left by this process.
+    """
+    if not CLAIMED_DIR.exists():
+        return 0
+    recovered = 0
+    for claim_dir in CLAIMED_DIR.iterdir():
+        if not claim_dir.is_dir():
+            continue
+        try:
+            fh = open(claim_dir / CLAIM_LOCK_NAME, 'a+')
+        except FileNotFoundError:
+            continue  # Removed by its owner or another recoverer
+        try:
+            if not _try_lock(fh):
+                continue  # Live run
+            try:
+                recovered += _return_files(claim_dir)
+            finally:
+                _unlock(fh)
+        finally:
+            fh.close()
+        _remove_claim_dir(claim_dir)
+    if recovered:
+        config.logger.warning(f"Recovered {recovered} file(s) from abandoned processor claims")
+    return recovered
+
+
+@contextmanager
+def process_lock():
+    """
+    Non-blocking exclusive lock for the DB -> clean output stage, which must run in
+    one worker at a time. Yields True if acquired, False if another worker holds it.
+    The OS drops the lock if the holder dies, so it can never go stale.
+    """
+    fh = open(PROCESS_LOCK_FILE, 'a+')
+    try:
+        if not _try_lock(fh):
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            _unlock(fh)
+    finally:
+        fh.close()
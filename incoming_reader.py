@@ -0,0 +1,145 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import config
+
+# Text columns are pinned so every CSV chunk gets the same dtypes instead of
+# per-chunk inference; numeric columns are left to the validators to coerce.
+CSV_DTYPES = {
+    'Transaction_Date': str,
+    'Branch': str,
+    'Transaction_Type': str,
+    'Customer_Name': str,
+}
+CSV_COMPRESSION = {'.gz': 'gzip', '.zst': 'zstd', '.zstd': 'zstd'}
+
+# suffix -> reader; see register_reader
+READERS = {}
+
+
+def register_reader(*suffixes, parallel=False):
+    """
+    Registers a reader for the given file suffixes.
+    A reader takes a path and yields DataFrames. `parallel` readers load a
+    whole file at once and are worth farming out to the decode pool (Excel);
+    streaming readers yield config.CHUNK_SIZE pieces in the calling process.
+    """
+    def decorator(fn):
+        fn.parallel = parallel
+        for suffix in suffixes:
+            READERS[suffix.lower()] = fn
+        return fn
+    return decorator
+
+
+@register_reader('.xlsx', '.xls', parallel=True)
+def read_excel(path):
+    yield pd.read_excel(path)
+
+
+@register_reader('.csv', '.csv.gz', '.csv.zst', '.csv.zstd')
+def read_csv(path):
+    compression = CSV_COMPRESSION.get(os.path.splitext(str(path))[1].lower())
+    yield from pd.read_csv(path, dtype=CSV_DTYPES, chunksize=config.CHUNK_SIZE, compression=compression)
+
+
+@register_reader('.parquet')
+def read_parquet(path):
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=config.CHUNK_SIZE):
+        yield batch.to_pandas()
+
+
+def get_reader(path):
+    """Returns the reader for a path (longest matching suffix wins), or None."""
+    name = str(path).lower()
+    for suffix in sorted(READERS, key=len, reverse=True):
+        if name.endswith(suffix):
+            return READERS[suffix]
+    return None
+
+
+def list_incoming(directory):
+    """All files in a directory that some registered reader understands."""
+    if not directory.exists():
+        return []
+    return [p for p in directory.iterdir() if p.is_file() and get_reader(p) is not None]
+
+
+def normalize_columns(df):
+    """Strip and underscore column names so they are safe as DB/CSV headers."""
+    df.columns = [str(c).strip().replace(" ", "_") for c in df.columns]
+    return df
+
+
+def decode_file(path):
+    """
+    Reads one whole incoming file into a DataFrame and times it.
+    Top-level so worker processes can pickle it.
+    """
+    start = time.perf_counter()
+    frames = [normalize_columns(df) for df in get_reader(path)(path)]
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    return df, time.perf_counter() - start
+
+
+def sort_by_arrival(paths):
+    """Oldest file first, so loads follow the order the feeder dropped them."""
+    return sorted(paths, key=lambda p: (os.path.getmtime(p), str(p)))
+
+
+def _stream_file(path):
+    """Yields normalized chunks of a streaming-format file, logging the total time."""
+    start = time.perf_counter()
+    rows = 0
+    for df in get_reader(path)(path):
+        rows += len(df)
+        yield normalize_columns(df)
+    config.logger.info(f"Decoded {os.path.basename(path)}: {rows} rows in {time.perf_counter() - start:.2f}s (streamed)")
+
+
+def iter_decoded_files(paths, workers=None):
+    """
+    Yields (path, frames, error) for each file in the given order, where
+    frames is an iterable of DataFrames for that file.
+    Excel files are decoded whole in a process pool (at most `workers` ahead
+    of the consumer); CSV/Parquet are streamed chunk by chunk when reached.
+    `error` is the exception raised while decoding a pooled file.
+    """
+    workers = workers or config.DECODE_WORKERS
+
+    def _result(path, fn):
+        try:
+            df, seconds = fn()
+        except Exception as e:
+            config.logger.error(f"Failed to decode {path}: {e}")
+            return path, None, e
+        config.logger.info(f"Decoded {os.path.basename(path)}: {len(df)} rows in {seconds:.2f}s")
+        return path, [df], None
+
+    def _emit(path, future):
+        if future is None:
+            return path, _stream_file(path), None
+        return _result(path, future.result)
+
+    use_pool = workers > 1 and sum(get_reader(p).parallel for p in paths) > 1
+    if not use_pool:
+        for path in paths:
+            if get_reader(path).parallel:
+                yield _result(path, lambda: decode_file(path))
+            else:
+                yield path, _stream_file(path), None
+        return
+
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in paths:
+            future = pool.submit(decode_file, path) if get_reader(path).parallel else None
+            pending.append((path, future))
+            # Hand files back in arrival order once the pool is saturated
+            while len(pending) > workers:
+                yield _emit(*pending.popleft())
+        while pending:
+            yield _emit(*pending.popleft())
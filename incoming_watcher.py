@@ -0,0 +1,137 @@
+import os
+import time
+import threading
+import config
+from incoming_reader import get_reader, list_incoming, sort_by_arrival
+
+
+class _EventCollector:
+    """
+    Collects created/modified/moved paths from a watchdog observer
+    (inotify on Linux, ReadDirectoryChangesW on Windows, FSEvents on macOS).
+    """
+    def __init__(self, directory):
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        collector = self
+        self._lock = threading.Lock()
+        self._paths = set()
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if event.is_directory:
+                    return
+                path = getattr(event, "dest_path", None) or event.src_path
+                with collector._lock:
+                    collector._paths.add(path)
+
+        self.observer = Observer()
+        self.observer.schedule(Handler(), str(directory), recursive=False)
+        self.observer.daemon = True
+        self.observer.start()
+
+    def drain(self):
+        with self._lock:
+            paths, self._paths = self._paths, set()
+        return paths
+
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+class IncomingWatcher:
+    """
+    Reports batches of incoming files once they are fully written.
+    - Arrivals come from filesystem events when the optional watchdog package is
+      installed, otherwise from a cheap directory scan every poll.
+    - A file counts as written once its size and mtime have been stable for
+      `debounce` seconds.
+    - Bursts are batched: a batch is released when nothing new has arrived for
+      `debounce` seconds, or once the oldest ready file has waited `max_batch_wait`.
+    """
+    def __init__(self, directory=None, debounce=None, max_batch_wait=None, poll_interval=None, use_events=True):
+        self.directory = directory or config.RAW_DATA_DIR / "incoming"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.debounce = config.WATCH_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.max_batch_wait = max_batch_wait or config.WATCH_MAX_BATCH_SECONDS
+        self.poll_interval = poll_interval or config.WATCH_POLL_SECONDS
+        self.pending = {}  # path -> [signature, last change, first seen]
+        self.seen = {}  # path -> signature already handed out in a batch
+        self.events = None
+        if use_events:
+            try:
+                self.events = _EventCollector(self.directory)
+            except ImportError:
+                config.logger.info("watchdog not installed; watching incoming/ by polling")
+        self.backend = "events" if self.events else "polling"
+        # Files already waiting at startup form the first batch
+        for path in list_incoming(self.directory):
+            self._touch(str(path), time.monotonic())
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def _touch(self, path, now):
+        sig = self._signature(path)
+        if sig is None or self.seen.get(path) == sig:
+            return
+        entry = self.pending.get(path)
+        if entry is None:
+            self.pending[path] = [sig, now, now]
+        elif entry[0] != sig:
+            entry[0], entry[1] = sig, now
+
+    def poll(self):
+        """
+        Non-blocking check. Returns the list of ready paths (oldest first) when a
+        batch should be processed, otherwise an empty list.
+        """
+        now = time.monotonic()
+        if self.events:
+            candidates = [p for p in self.events.drain() if get_reader(p) is not None]
+        else:
+            candidates = [str(p) for p in list_incoming(self.directory)]
+        for path in candidates:
+            self._touch(path, now)
+
+        # Re-check everything still pending: growth resets its debounce clock
+        for path in list(self.pending):
+            sig = self._signature(path)
+            if sig is None:
+                del self.pending[path]  # Gone (moved away or deleted)
+            elif sig != self.pending[path][0]:
+                self.pending[path][0], self.pending[path][1] = sig, now
+
+        if not self.pending:
+            return []
+        quiet = all(now - last >= self.debounce for _, last, _ in self.pending.values())
+        ready = [p for p, (_, last, _) in self.pending.items() if now - last >= self.debounce]
+        overdue = any(now - first >= self.max_batch_wait for p, (_, _, first) in self.pending.items() if p in ready)
+        if not (quiet or overdue) or not ready:
+            return []
+
+        # Forget files that have since been moved to processed/
+        self.seen = {p: sig for p, sig in self.seen.items() if os.path.exists(p)}
+        for path in ready:
+            self.seen[path] = self.pending.pop(path)[0]
+        return sort_by_arrival(ready)
+
+    def wait_for_batch(self, timeout=None):
+        """Blocks until a batch is ready (or timeout seconds pass) and returns it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            batch = self.poll()
+            if batch or (deadline is not None and time.monotonic() >= deadline):
+                return batch
+            time.sleep(self.poll_interval)
+
+    def stop(self):
+        if self.events:
+            self.events.stop()
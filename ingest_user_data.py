@@ -1,8 +1,8 @@
 import pandas as pd
-import sqlite3
 import config
-import glob
 import os
+from bulk_loader import BulkLoader
+from incoming_reader import get_reader, list_incoming, normalize_columns
 
 def ingest_data():
     """
@@ -11,12 +11,11 @@ def ingest_data():
     """
     config.logger.info("Starting Data Ingestion Process...")
     
-    # 1. Find file
-    files = glob.glob(str(config.RAW_DATA_DIR / "*.*"))
-    validation_files = [f for f in files if f.endswith(('.csv', '.xlsx', '.xls'))]
+    # 1. Find file (any format with a registered reader)
+    validation_files = sorted(str(p) for p in list_incoming(config.RAW_DATA_DIR))
     
     if not validation_files:
-        config.logger.error(f"No CSV or Excel files found in {config.RAW_DATA_DIR}")
+        config.logger.error(f"No CSV, Parquet or Excel files found in {config.RAW_DATA_DIR}")
         print(f"❌ ERROR: Please place your banking data file in {config.RAW_DATA_DIR}")
         return
 
@@ -24,23 +23,19 @@ def ingest_data():
     config.logger.info(f"Found file: {file_path}")
     
     try:
-        # 2. Read File
-        if file_path.endswith('.csv'):
-            df = pd.read_csv(file_path)
-        else:
-            df = pd.read_excel(file_path)
-            
-        config.logger.info(f"Loaded {len(df)} rows from file.")
+        # 2. Read File (CSV/Parquet are streamed in CHUNK_SIZE pieces)
+        frames = get_reader(file_path)(file_path)
         
         # 3. Basic Standardization (Optional: Map columns if needed)
         # For now, we assume the user's columns are roughly correct or we clean them later.
         # We replace spaces in column names with underscores for DB safety.
-        df.columns = [c.strip().replace(" ", "_") for c in df.columns]
+        frames = (normalize_columns(df) for df in frames)
         
-        # 4. Save to Database
-        conn = sqlite3.connect(config.DB_PATH)
-        df.to_sql(config.TABLE_NAME, conn, if_exists='replace', index=False)
-        conn.close()
+        # 4. Save to Database (WAL + batched inserts, replaces the table)
+        loader = BulkLoader()
+        rows = loader.load_chunks(frames, replace=True)
+        loader.close()
+        config.logger.info(f"Loaded {rows} rows from file.")
         
         config.logger.info(f"Successfully saved data to {config.TABLE_NAME} table in {config.DB_PATH}")
         print(f"✅ Success! Data loaded into Database. Ready for Chunk Processing.")
@@ -1,7 +1,7 @@
 """
 Data Cleaner - Main Entry Point
 ================================
-Processes Excel files from raw_data/incoming/ folder.
+Processes Excel, CSV (plain/gz/zstd) and Parquet files from raw_data/incoming/ folder.
 
 Usage:
     python main.py
@@ -10,9 +10,9 @@ Usage:
 """
 
 import pandas as pd
-import glob
 import os
 import shutil
+import multiprocessing
 from pathlib import Path
 
 # Use relative paths for portability
@@ -20,51 +20,74 @@ BASE_DIR = Path(__file__).parent
 RAW_DATA_DIR = BASE_DIR / "raw_data"
 INCOMING_DIR = RAW_DATA_DIR / "incoming"
 PROCESSED_DIR = RAW_DATA_DIR / "processed"
+FAILED_DIR = RAW_DATA_DIR / "failed"
 OUTPUT_DIR = BASE_DIR / "output"
+STAGING_DIR = OUTPUT_DIR / "staging"
 
 # Ensure directories exist
 INCOMING_DIR.mkdir(parents=True, exist_ok=True)
 PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+FAILED_DIR.mkdir(parents=True, exist_ok=True)
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 # Import cleaning modules
+import config
 from validators import validate_chunk
 from cleaners import clean_data
 from reporter import Reporter
+from stream_writer import StreamingWriter
+from parquet_store import ParquetMasterStore
+from incoming_reader import iter_decoded_files, list_incoming, sort_by_arrival
 
 
 def get_incoming_files():
-    """Get all Excel files from incoming directory."""
-    xlsx_files = list(INCOMING_DIR.glob("*.xlsx"))
-    xls_files = list(INCOMING_DIR.glob("*.xls"))
-    return xlsx_files + xls_files
+    """Get all supported files (Excel, CSV, Parquet) from incoming directory, oldest first."""
+    return sort_by_arrival(list_incoming(INCOMING_DIR))
 
 
-def process_file(filepath, reporter):
-    """Process a single Excel file."""
+def process_file(filepath, frames, reporter, writer):
+    """
+    Process a single decoded file chunk by chunk.
+    Clean and discarded rows are staged on disk and only handed to the writer
+    and reporter once the whole file has decoded, so a file that fails partway
+    leaves none of its rows in the master data. Returns True on success.
+    """
     print(f"   📄 Processing: {filepath.name}")
     
+    staging = STAGING_DIR / filepath.name
+    if staging.exists():
+        shutil.rmtree(staging)  # Leftovers of an interrupted run
+    staging.mkdir(parents=True)
+    
     try:
-        df = pd.read_excel(filepath)
-        
-        # Clean column names
-        df.columns = [str(c).strip().replace(" ", "_") for c in df.columns]
-        
-        # Validate
-        valid_df, invalid_df, report = validate_chunk(df)
-        reporter.update_stats(report)
-        reporter.log_discards(invalid_df)
+        reports, clean_parts, invalid_parts = [], [], []
+        for i, df in enumerate(frames):
+            # Validate
+            valid_df, invalid_df, report = validate_chunk(df)
+            reports.append(report)
+            if not invalid_df.empty:
+                invalid_parts.append(staging / f"{i:06d}_invalid.pkl")
+                invalid_df.to_pickle(invalid_parts[-1])
+            
+            # Clean
+            if not valid_df.empty:
+                clean_parts.append(staging / f"{i:06d}_clean.pkl")
+                clean_data(valid_df).to_pickle(clean_parts[-1])
         
-        # Clean
-        if not valid_df.empty:
-            clean_df = clean_data(valid_df)
-            return clean_df
-        
-        return pd.DataFrame()
+        # Whole file decoded: commit its rows
+        for report in reports:
+            reporter.update_stats(report)
+        for part in invalid_parts:
+            reporter.log_discards(pd.read_pickle(part))
+        for part in clean_parts:
+            writer.write(pd.read_pickle(part))
+        return True
         
     except Exception as e:
         print(f"   ❌ Error processing {filepath.name}: {e}")
-        return pd.DataFrame()
+        return False
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
 
 
 def move_to_processed(filepath):
@@ -74,6 +97,13 @@ def move_to_processed(filepath):
     print(f"   ➡️  Moved to processed/")
 
 
+def move_to_failed(filepath):
+    """Move a file that could not be read to the failed folder for inspection."""
+    dest = FAILED_DIR / filepath.name
+    shutil.move(str(filepath), str(dest))
+    print(f"   ⚠️  Moved to failed/")
+
+
 def main():
     print("=" * 50)
     print("🏦 DATA CLEANER - Processing Pipeline")
@@ -84,7 +114,7 @@ def main():
     
     if not files:
         print("\n💤 No files found in raw_data/incoming/")
-        print("   Place Excel files there or run: python pg_fetcher.py --table <name>")
+        print("   Place Excel/CSV/Parquet files there or run: python pg_fetcher.py --table <name>")
         return
     
     print(f"\n📂 Found {len(files)} file(s) to process:")
@@ -92,35 +122,35 @@ def main():
         print(f"   • {f.name}")
     
     reporter = Reporter()
-    all_clean_data = []
+    # Rebuild the Master CSV (and the Parquet store, when enabled) from this run, one file at a time
+    output_path = OUTPUT_DIR / "master_clean_data.csv"
+    store = ParquetMasterStore() if config.PARQUET_STORE_ENABLED else None
+    writer = StreamingWriter(output_path=output_path, overwrite=True, parquet_store=store)
     
     print("\n🔄 Processing...")
     
-    for filepath in files:
-        clean_df = process_file(filepath, reporter)
-        
-        if not clean_df.empty:
-            all_clean_data.append(clean_df)
+    # Decode in a process pool; results still arrive in file order
+    for filepath, frames, error in iter_decoded_files(files):
+        if error is not None:
+            print(f"   ❌ Error processing {filepath.name}: {error}")
+            ok = False
+        else:
+            ok = process_file(filepath, frames, reporter, writer)
         
-        # Move to processed
-        move_to_processed(filepath)
+        # Move to processed (or failed/, with none of its rows written)
+        if ok:
+            move_to_processed(filepath)
+        else:
+            move_to_failed(filepath)
+    
+    writer.close()
     
     # Compile results
     print("\n✅ Processing Complete!")
     
-    if all_clean_data:
-        final_df = pd.concat(all_clean_data, ignore_index=True)
-        
-        # Save Master CSV
-        output_path = OUTPUT_DIR / "master_clean_data.csv"
-        final_df.to_csv(output_path, index=False)
+    if writer.rows_written:
         print(f"\n💾 Output saved: {output_path}")
-        print(f"   Total rows: {len(final_df)}")
-        
-        # Generate Excel output
-        from excel_generator import ExcelGenerator
-        excel_gen = ExcelGenerator(final_df)
-        excel_gen.generate_daily_files()
+        print(f"   Total rows: {writer.rows_written}")
         
         # Package if needed
         from temporal_packager import TemporalPackager
@@ -134,4 +164,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Decode workers under the PyInstaller .exe
     main()
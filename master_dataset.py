@@ -0,0 +1,71 @@
+import threading
+from pathlib import Path
+import pandas as pd
+import config
+from parquet_store import ParquetMasterStore, CATEGORICAL_COLUMNS
+
+# Low-cardinality text columns held as pandas categoricals (codes + one copy of each label)
+MASTER_CATEGORIES = CATEGORICAL_COLUMNS + ['Customer_Name']
+MASTER_DTYPES = {'Amount': 'float64', **{col: 'category' for col in MASTER_CATEGORIES}}
+
+_lock = threading.Lock()
+_cache = {"version": None, "df": None}
+
+
+def master_path():
+    """Parquet store directory when enabled and populated, else the master CSV."""
+    if config.PARQUET_STORE_ENABLED and ParquetMasterStore().exists():
+        return config.PARQUET_STORE_DIR
+    return config.OUTPUT_DIR / "master_clean_data.csv"
+
+
+def master_version(path=None):
+    """
+    Cheap change token for the master data: (path, mtime_ns, size) of the CSV, or
+    (path, file count, newest mtime_ns) of the Parquet store. None if there is no data.
+    """
+    path = Path(path or master_path())
+    if path.is_dir():
+        stats = [p.stat() for p in path.rglob("*.parquet")]
+        if not stats:
+            return None
+        return (str(path), len(stats), max(st.st_mtime_ns for st in stats))
+    if not path.exists():
+        return None
+    st = path.stat()
+    return (str(path), st.st_mtime_ns, st.st_size)
+
+
+def read_master(path=None):
+    """
+    One typed read of the master data: dates parsed once, Amount as float64 and
+    text dimensions as categoricals. Returns None if there is no data yet.
+    """
+    path = Path(path or master_path())
+    if path.is_dir():
+        df = ParquetMasterStore(path).read()
+    elif path.exists():
+        header = pd.read_csv(path, nrows=0).columns
+        dtypes = {col: dtype for col, dtype in MASTER_DTYPES.items() if col in header}
+        parse_dates = ['Transaction_Date'] if 'Transaction_Date' in header else False
+        df = pd.read_csv(path, dtype=dtypes, parse_dates=parse_dates)
+    else:
+        return None
+
+    for col, dtype in MASTER_DTYPES.items():
+        if col in df.columns and str(df[col].dtype) != dtype:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def get_master_dataset():
+    """
+    Process-wide shared handle: returns (df, version), reloading only when the
+    master data has changed on disk. Callers must treat df as read-only.
+    """
+    version = master_version()
+    with _lock:
+        if _cache["version"] != version or _cache["df"] is None:
+            _cache["df"] = read_master() if version is not None else None
+            _cache["version"] = version
+        return _cache["df"], _cache["version"]
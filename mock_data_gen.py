@@ -1,42 +1,165 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-import random
+import argparse
+import time
 import os
 
 # Settings
 NUM_ROWS = 5000
 OUTPUT_FILE = "c:/data_cleaner/raw_data/mock_bank_data.csv"
+CHUNK_ROWS = 1_000_000  # Rows generated and written per chunk
+BRANCHES = ['New York', 'London', 'Mumbai', 'Singapore', 'Tokyo']
+TYPES = ['Credit', 'Debit', 'Transfer']
+NUM_CUSTOMERS = 1000
+INVALID_KINDS = ("missing_amount", "missing_date", "missing_branch")
+SEEDED_END = "2025-01-01"  # Default end date when seeded, so a seed alone reproduces the data
 
-def generate_mock_data():
+
+def skewed_weights(n, skew):
+    """Zipf-like weights: skew 0 is uniform, larger values favour the first categories."""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def generate_frame(rng, rows, start, end, id_start=1000, customers=NUM_CUSTOMERS, skew=0.0,
+                   duplicate_rate=0.0, invalid_rate=0.0, sort_dates=False):
+    """
+    Builds one chunk of mock transactions with NumPy only (no per-row Python).
+    - dates are uniform over [start, end); IDs run from id_start
+    - skew biases branches, types and customers towards the first few
+    - duplicate_rate appends exact copies of random rows
+    - invalid_rate blanks the amount, date or branch of random rows
+    """
+    span = int((pd.Timestamp(end) - pd.Timestamp(start)).total_seconds())
+    offsets = rng.integers(0, max(span, 1), rows)
+    if sort_dates:
+        offsets.sort()
+    dates = pd.Timestamp(start).to_datetime64() + offsets.astype("timedelta64[s]")
+
+    customer_names = [f"Customer_{i}" for i in range(1, customers + 1)]
+    df = pd.DataFrame({
+        'Transaction_ID': np.arange(id_start, id_start + rows, dtype=np.int64),
+        'Transaction_Date': dates.astype("datetime64[ns]"),
+        'Amount': np.round(rng.uniform(-100, 10000, rows), 2),  # Include some negatives for testing
+        'Branch': pd.Categorical.from_codes(
+            rng.choice(len(BRANCHES), rows, p=skewed_weights(len(BRANCHES), skew)), BRANCHES),
+        'Transaction_Type': pd.Categorical.from_codes(
+            rng.choice(len(TYPES), rows, p=skewed_weights(len(TYPES), skew)), TYPES),
+        'Customer_Name': pd.Categorical.from_codes(
+            rng.choice(customers, rows, p=skewed_weights(customers, skew)), customer_names),
+    })
+
+    # Inject invalid rows
+    n_invalid = int(round(rows * invalid_rate))
+    if n_invalid:
+        idx = rng.choice(rows, n_invalid, replace=False)
+        kinds = rng.integers(0, len(INVALID_KINDS), n_invalid)
+        df.loc[idx[kinds == 0], 'Amount'] = np.nan
+        df.loc[idx[kinds == 1], 'Transaction_Date'] = pd.NaT
+        df.loc[idx[kinds == 2], 'Branch'] = np.nan
+
+    # Inject duplicates
+    n_dup = int(round(rows * duplicate_rate))
+    if n_dup:
+        df = pd.concat([df, df.iloc[rng.choice(rows, n_dup)]], ignore_index=True)
+
+    return df
+
+
+def iter_mock_chunks(rows, chunk_rows=None, seed=None, start=None, end=None, **kwargs):
+    """
+    Yields frames totalling `rows` rows (before duplicate injection).
+    The same seed and settings always produce the same data: with a seed the
+    date range defaults to a fixed window ending SEEDED_END, not to now.
+    """
+    chunk_rows = chunk_rows or CHUNK_ROWS
+    if end is None:
+        end = SEEDED_END if seed is not None else datetime.now()
+    end = pd.Timestamp(end).floor("s")
+    start = pd.Timestamp(start) if start is not None else end - timedelta(days=NUM_ROWS)
+    rng = np.random.default_rng(seed)
+    id_start = 1000
+    remaining = rows
+    while remaining > 0:
+        n = min(chunk_rows, remaining)
+        yield generate_frame(rng, n, start, end, id_start=id_start, **kwargs)
+        id_start += n
+        remaining -= n
+
+
+def write_chunks(frames, output_path):
+    """Streams frames to .csv, .parquet or a SQLite .db (via BulkLoader), chosen by suffix."""
+    output_path = str(output_path)
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    total = 0
+
+    if output_path.endswith(".parquet"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        writer = None
+        try:
+            for df in frames:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+                total += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+
+    elif output_path.endswith((".db", ".sqlite")):
+        from bulk_loader import BulkLoader
+
+        def counted(frames):
+            nonlocal total
+            for df in frames:
+                total += len(df)
+                yield df
+
+        loader = BulkLoader(db_path=output_path)
+        try:
+            loader.load_chunks(counted(frames), replace=True)
+        finally:
+            loader.close()
+
+    else:
+        first = True
+        for df in frames:
+            df.to_csv(output_path, mode='w' if first else 'a', header=first, index=False)
+            first = False
+            total += len(df)
+
+    return total
+
+
+def generate_mock_data(rows=NUM_ROWS, output_file=OUTPUT_FILE, seed=None, chunk_rows=None,
+                       start=None, end=None, skew=0.0, duplicate_rate=0.02, invalid_rate=0.0):
     print("Generating mock data...")
-    
-    # Generators
-    ids = np.arange(1000, 1000 + NUM_ROWS)
-    dates = [datetime.now() - timedelta(days=x) for x in range(NUM_ROWS)]
-    amounts = np.round(np.random.uniform(-100, 10000, NUM_ROWS), 2) # Include some negatives for testing
-    branches = ['New York', 'London', 'Mumbai', 'Singapore', 'Tokyo']
-    types = ['Credit', 'Debit', 'Transfer']
-    
-    data = {
-        'Transaction_ID': ids,
-        'Transaction_Date': dates,
-        'Amount': amounts,
-        'Branch': [random.choice(branches) for _ in range(NUM_ROWS)],
-        'Transaction_Type': [random.choice(types) for _ in range(NUM_ROWS)],
-        'Customer_Name': [f"Customer_{i}" for i in range(NUM_ROWS)]
-    }
-    
-    df = pd.DataFrame(data)
-    
-    # Inject some duplicates
-    df = pd.concat([df, df.iloc[:100]], ignore_index=True)
-    
-    # Ensure dir exists
-    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
-    
-    df.to_csv(OUTPUT_FILE, index=False)
-    print(f"Mock data saved to {OUTPUT_FILE}")
+    t0 = time.perf_counter()
+
+    frames = iter_mock_chunks(rows, chunk_rows=chunk_rows, seed=seed, start=start, end=end, skew=skew,
+                              duplicate_rate=duplicate_rate, invalid_rate=invalid_rate)
+    total = write_chunks(frames, output_file)
+
+    secs = time.perf_counter() - t0
+    print(f"Mock data saved to {output_file} ({total:,} rows in {secs:.1f}s, {total / max(secs, 1e-9):,.0f} rows/sec)")
+    return total
+
 
 if __name__ == "__main__":
-    generate_mock_data()
+    parser = argparse.ArgumentParser(description="Generate reproducible mock banking transactions")
+    parser.add_argument("--rows", type=int, default=NUM_ROWS, help="Rows to generate (before duplicates)")
+    parser.add_argument("--output", "-o", default=OUTPUT_FILE, help="Target .csv, .parquet or .db file")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible output")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows generated and written per chunk")
+    parser.add_argument("--start", default=None, help="First transaction date (default: NUM_ROWS days ago)")
+    parser.add_argument("--end", default=None, help=f"Last transaction date (default: now, or {SEEDED_END} with --seed)")
+    parser.add_argument("--skew", type=float, default=0.0, help="0 = uniform; higher favours a few branches/customers")
+    parser.add_argument("--duplicate-rate", type=float, default=0.02, help="Fraction of rows duplicated")
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Fraction of rows with a missing amount/date/branch")
+    args = parser.parse_args()
+    generate_mock_data(rows=args.rows, output_file=args.output, seed=args.seed, chunk_rows=args.chunk_rows,
+                       start=args.start, end=args.end, skew=args.skew,
+                       duplicate_rate=args.duplicate_rate, invalid_rate=args.invalid_rate)
@@ -0,0 +1,209 @@
+"""
+Parquet Master Store
+====================
+Columnar alternative to output/master_clean_data.csv, partitioned by
+transaction month (year=YYYY/month=M/) with typed columns, so readers can
+project columns and push date-range predicates down to the files.
+
+Usage:
+    python parquet_store.py --rebuild   # Rebuild the store from the master CSV
+"""
+
+import uuid
+import shutil
+import tempfile
+import argparse
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+import config
+
+CATEGORICAL_COLUMNS = ['Branch', 'Transaction_Type']
+PARTITION_COLUMNS = ['year', 'month']
+
+
+def _end_exclusive(end_date):
+    """Exclusive upper bound for an inclusive end date (a bare date covers the whole day)."""
+    end = pd.Timestamp(end_date)
+    return end + pd.Timedelta(days=1) if end == end.normalize() else end + pd.Timedelta(1)
+
+
+class ParquetMasterStore:
+    def __init__(self, root=None):
+        self.root = root or config.PARQUET_STORE_DIR
+
+    def exists(self):
+        return self.root.exists() and any(self.root.rglob("*.parquet"))
+
+    def clear(self):
+        """Delete every row (the master CSV is being rewritten from scratch)."""
+        if self.root.exists():
+            shutil.rmtree(self.root)
+
+    def _to_table(self, df):
+        """Coerce a cleaned frame to the store's typed schema."""
+        df = df.copy()
+        df['Transaction_Date'] = pd.to_datetime(df['Transaction_Date'])
+        if 'Amount' in df.columns:
+            df['Amount'] = pd.to_numeric(df['Amount'], errors='coerce').astype('float64')
+        df['year'] = df['Transaction_Date'].dt.year.astype('int32')
+        df['month'] = df['Transaction_Date'].dt.month.astype('int32')
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for col in CATEGORICAL_COLUMNS:
+            if col in table.column_names:
+                idx = table.schema.get_field_index(col)
+                values = table.column(col).cast(pa.string()).dictionary_encode()
+                table = table.set_column(idx, pa.field(col, values.type), values)
+        return table
+
+    def append(self, df):
+        """Append rows as new files in their year/month partitions."""
+        if df.empty:
+            return 0
+        table = self._to_table(df)
+        ds.write_dataset(
+            table,
+            str(self.root.resolve()),
+            filesystem=fs.LocalFileSystem(),
+            format="parquet",
+            partitioning=ds.partitioning(
+                pa.schema([('year', pa.int32()), ('month', pa.int32())]), flavor="hive"
+            ),
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        return len(df)
+
+    def _dataset(self):
+        # Explicit local filesystem so Windows drive paths aren't parsed as URIs
+        return ds.dataset(str(self.root.resolve()), filesystem=fs.LocalFileSystem(),
+                          format="parquet", partitioning="hive")
+
+    def read(self, columns=None, start_date=None, end_date=None):
+        """
+        Load rows with optional column projection and an inclusive date range.
+        The range prunes year/month partitions first, then filters row groups
+        on Transaction_Date, so only the needed files and columns are read.
+        """
+        if not self.exists():
+            return pd.DataFrame(columns=columns or [])
+
+        dataset = self._dataset()
+        predicate = None
+
+        if start_date is not None:
+            start = pd.Timestamp(start_date)
+            year, month = ds.field('year'), ds.field('month')
+            predicate = (year > start.year) | ((year == start.year) & (month >= start.month))
+            predicate &= ds.field('Transaction_Date') >= start.to_pydatetime()
+
+        if end_date is not None:
+            end = pd.Timestamp(end_date)
+            year, month = ds.field('year'), ds.field('month')
+            end_pred = (year < end.year) | ((year == end.year) & (month <= end.month))
+            end_pred &= ds.field('Transaction_Date') < _end_exclusive(end).to_pydatetime()
+            predicate = end_pred if predicate is None else predicate & end_pred
+
+        if columns is None:
+            columns = [c for c in dataset.schema.names if c not in PARTITION_COLUMNS]
+        table = dataset.to_table(columns=list(columns), filter=predicate)
+        df = table.to_pandas()
+
+        if 'Transaction_Date' in df.columns:
+            df = df.sort_values('Transaction_Date', kind='stable').reset_index(drop=True)
+        return df
+
+    def rebuild_from_csv(self, csv_path=None, chunksize=100_000):
+        """Recreate the store from the master CSV, streaming it in chunks."""
+        csv_path = csv_path or config.OUTPUT_DIR / "master_clean_data.csv"
+        self.clear()
+
+        total = 0
+        for chunk in pd.read_csv(csv_path, chunksize=chunksize):
+            total += self.append(chunk)
+        config.logger.info(f"ParquetMasterStore: rebuilt {total} rows from {csv_path}")
+        print(f"🗄️  Rebuilt Parquet store with {total} rows.")
+        return total
+
+
+def read_csv_range(csv_path, columns=None, start_date=None, end_date=None, chunksize=100_000):
+    """
+    Read the master CSV with the same projection/date-range semantics as the
+    store. The file is scanned in chunks so only matching rows are kept.
+    """
+    if not csv_path.exists():
+        return None
+
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(list(columns) + ['Transaction_Date']))
+
+    parts = []
+    for chunk in pd.read_csv(csv_path, usecols=usecols, chunksize=chunksize):
+        if 'Transaction_Date' in chunk.columns:
+            chunk['Transaction_Date'] = pd.to_datetime(chunk['Transaction_Date'])
+            if start_date is not None:
+                chunk = chunk[chunk['Transaction_Date'] >= pd.Timestamp(start_date)]
+            if end_date is not None:
+                chunk = chunk[chunk['Transaction_Date'] < _end_exclusive(end_date)]
+        parts.append(chunk)
+
+    df = pd.concat(parts, ignore_index=True) if parts else pd.read_csv(csv_path, usecols=usecols)
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+class CsvMonthBuckets:
+    """
+    Splits the master CSV into one temporary file per wanted (year, month) in
+    a single chunked scan, so reading many months costs one pass over the file
+    instead of one pass per month. read_range() then only reads the bucket of
+    the range's month. Use as a context manager; the buckets are deleted on exit.
+    """
+    def __init__(self, csv_path, months, chunksize=100_000):
+        self.csv_path = csv_path
+        self.months = set(months)
+        self.chunksize = chunksize
+        self.paths = {}
+        self._tmp = None
+
+    def __enter__(self):
+        self._tmp = tempfile.TemporaryDirectory(prefix="month_buckets_", dir=config.OUTPUT_DIR)
+        if not self.csv_path.exists() or not self.months:
+            return self
+        wanted = {year * 12 + month - 1 for year, month in self.months}
+        for chunk in pd.read_csv(self.csv_path, chunksize=self.chunksize):
+            dates = pd.to_datetime(chunk['Transaction_Date'])
+            keys = dates.dt.year * 12 + dates.dt.month - 1
+            chunk = chunk[keys.isin(wanted)]
+            for key, rows in chunk.groupby(keys[chunk.index]):
+                month = (int(key) // 12, int(key) % 12 + 1)
+                path = self.paths.get(month)
+                if path is None:
+                    path = self.paths[month] = Path(self._tmp.name) / f"{month[0]}-{month[1]:02d}.csv"
+                rows.to_csv(path, mode='a', header=not path.exists(), index=False)
+        return self
+
+    def read_range(self, start, end):
+        """Rows in an inclusive date range inside one month (None if the month has none)."""
+        path = self.paths.get((start.year, start.month))
+        if path is None:
+            return None
+        return read_csv_range(path, start_date=start, end_date=end)
+
+    def __exit__(self, *exc):
+        self._tmp.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the Parquet master store")
+    parser.add_argument("--rebuild", action="store_true", help="Rebuild the store from master_clean_data.csv")
+    args = parser.parse_args()
+    if args.rebuild:
+        ParquetMasterStore().rebuild_from_csv()
+    else:
+        parser.print_help()
@@ -6,16 +6,28 @@ Connects to PostgreSQL, fetches table data, and exports to Excel.
 Usage:
     python pg_fetcher.py                    # Uses table from .env
     python pg_fetcher.py --table my_table   # Specify table name
+    python pg_fetcher.py --table my_table --stream --format csv --shard-rows 500000
+    python pg_fetcher.py --table my_table --incremental --watermark updated_at
+    python pg_fetcher.py --table my_table --benchmark   # Time fetch_table vs COPY
+    python pg_fetcher.py --table a b c --workers 4      # Fetch several tables concurrently
+    python pg_fetcher.py --all --workers 8              # Every table from --list
+    python pg_fetcher.py --table ledger --split-column id --ranges 8 --workers 8
 """
 
 import os
 import sys
+import csv
+import json
+import time
+import tempfile
 import argparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 
 import pandas as pd
 import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -34,6 +46,17 @@ PG_CONFIG = {
 BASE_DIR = Path(__file__).parent
 RAW_DATA_DIR = BASE_DIR / "raw_data" / "incoming"
 
+# Per-table high-watermarks for --incremental
+STATE_FILE = BASE_DIR / "output" / "pg_fetcher_state.json"
+
+# Parallel fetch defaults
+PARALLEL_WORKERS = 4
+
+# Streaming export defaults
+STREAM_ITERSIZE = 10_000       # Rows per round-trip from the server-side cursor
+STREAM_SHARD_ROWS = 500_000    # Rows per output shard file
+EXCEL_MAX_ROWS = 1_048_575     # Excel sheet limit minus the header row
+
 
 def connect_postgres():
     """Establish connection to PostgreSQL database."""
@@ -81,6 +104,394 @@ def export_to_excel(df, table_name):
     return filename
 
 
+class ShardWriter:
+    """
+    Writes row batches into fixed-size numbered shards (CSV, Parquet or xlsx).
+    Only one shard is open at a time and rows are never accumulated beyond a
+    batch, so memory stays constant regardless of table size. Shards are
+    written under a .part name and only renamed into place by close(), once
+    the whole table is written, so the processor never picks up a half-written
+    file or part of a table. abort() discards every shard.
+    """
+    def __init__(self, table_name, columns, fmt="csv", shard_rows=STREAM_SHARD_ROWS):
+        self.table_name = table_name
+        self.columns = columns
+        self.fmt = fmt
+        self.shard_rows = min(shard_rows, EXCEL_MAX_ROWS) if fmt == "xlsx" else shard_rows
+        self.timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.files = []
+        self._finished = []  # Complete shards still under their .part name
+        self._shard_index = 0
+        self._rows_in_shard = 0
+        self._handle = None
+        self._path = None
+
+    def _open(self):
+        self._shard_index += 1
+        self._rows_in_shard = 0
+        name = f"{self.table_name}_{self.timestamp}_part{self._shard_index:04d}.{self.fmt}"
+        self._path = RAW_DATA_DIR / name
+        part_path = str(self._path) + ".part"
+
+        if self.fmt == "csv":
+            f = open(part_path, "w", newline="", encoding="utf-8")
+            writer = csv.writer(f)
+            writer.writerow(self.columns)
+            self._handle = (f, writer)
+        elif self.fmt == "xlsx":
+            import xlsxwriter
+            workbook = xlsxwriter.Workbook(part_path, {
+                "constant_memory": True,
+                "remove_timezone": True,
+                "default_date_format": "yyyy-mm-dd hh:mm:ss",
+            })
+            sheet = workbook.add_worksheet("Data")
+            sheet.write_row(0, 0, self.columns)
+            self._handle = (workbook, sheet)
+        elif self.fmt == "parquet":
+            self._handle = [part_path, None]  # ParquetWriter opened on first batch (needs schema)
+        else:
+            raise ValueError(f"Unsupported shard format: {self.fmt}")
+
+    def _write_batch(self, rows):
+        if self.fmt == "csv":
+            self._handle[1].writerows(rows)
+        elif self.fmt == "xlsx":
+            _, sheet = self._handle
+            for i, row in enumerate(rows, start=self._rows_in_shard + 1):
+                sheet.write_row(i, 0, row)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            df = pd.DataFrame.from_records(rows, columns=self.columns)
+            part_path, writer = self._handle
+            if writer is None:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                writer = pq.ParquetWriter(part_path, table.schema)
+                self._handle[1] = writer
+            else:
+                table = pa.Table.from_pandas(df, schema=writer.schema, preserve_index=False)
+            writer.write_table(table)
+        self._rows_in_shard += len(rows)
+
+    def _close_handle(self):
+        handle, self._handle = self._handle, None
+        if self.fmt in ("csv", "xlsx"):
+            handle[0].close()
+        elif handle[1] is not None:
+            handle[1].close()
+
+    def _close(self):
+        if self._handle is None:
+            return
+        self._close_handle()
+        self._finished.append(self._path)
+        print(f"   💾 Shard {self._shard_index}: {self._path.name} ({self._rows_in_shard:,} rows)")
+
+    def write(self, rows):
+        """Write a batch of row tuples, rolling over to a new shard when full."""
+        while rows:
+            if self._handle is None:
+                self._open()
+            room = self.shard_rows - self._rows_in_shard
+            batch, rows = rows[:room], rows[room:]
+            self._write_batch(batch)
+            if self._rows_in_shard >= self.shard_rows:
+                self._close()
+
+    def close(self):
+        """Finish the open shard and publish every shard of the table."""
+        self._close()
+        for path in self._finished:
+            os.replace(str(path) + ".part", path)
+            self.files.append(path)
+        self._finished = []
+        return self.files
+
+    def abort(self):
+        """Discard the table: close the open shard and delete every .part file."""
+        parts = list(self._finished)
+        if self._handle is not None:
+            parts.append(self._path)
+            try:
+                self._close_handle()
+            except Exception:
+                pass  # The shard is deleted anyway
+        for path in parts:
+            Path(str(path) + ".part").unlink(missing_ok=True)
+        self._finished = []
+
+
+def stream_table(conn, table_name, fmt="csv", shard_rows=STREAM_SHARD_ROWS, itersize=STREAM_ITERSIZE):
+    """
+    Stream a table through a named (server-side) cursor into shard files.
+    The server holds the result set; we pull `itersize` rows per round-trip,
+    so client memory is bounded by one batch instead of the whole table.
+    Shards are published only once the whole table has been read; if the
+    fetch fails, none of them are left behind.
+    """
+    RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    print(f"📥 Streaming table: {table_name} (format={fmt}, shard={shard_rows:,} rows)...")
+
+    cursor = conn.cursor(name=f"stream_{table_name}_{os.getpid()}")
+    cursor.itersize = itersize
+    cursor.execute(f"SELECT * FROM {table_name}")
+
+    writer = None
+    total = 0
+    start = time.perf_counter()
+    try:
+        while True:
+            rows = cursor.fetchmany(itersize)
+            if not rows:
+                break
+            if writer is None:
+                # Named cursors only expose a description after the first fetch
+                columns = [desc[0] for desc in cursor.description]
+                writer = ShardWriter(table_name, columns, fmt=fmt, shard_rows=shard_rows)
+            writer.write(rows)
+            total += len(rows)
+
+            elapsed = time.perf_counter() - start
+            rate = total / elapsed if elapsed > 0 else 0
+            print(f"   ⏳ {total:,} rows ({rate:,.0f} rows/sec)", end="\r", flush=True)
+        files = writer.close() if writer else []
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    finally:
+        cursor.close()
+
+    elapsed = time.perf_counter() - start
+    rate = total / elapsed if elapsed > 0 else 0
+    print(f"\n   Retrieved {total:,} rows into {len(files)} shard(s) in {elapsed:.1f}s ({rate:,.0f} rows/sec)")
+    return files
+
+
+def load_watermarks():
+    if STATE_FILE.exists():
+        with open(STATE_FILE, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def save_watermark(table_name, column, value):
+    state = load_watermarks()
+    # Non-numeric watermarks (timestamps, dates) are stored as text;
+    # PostgreSQL casts the quoted literal back to the column type.
+    if not isinstance(value, (int, float)):
+        value = str(value)
+    state[table_name] = {"column": column, "value": value}
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    with open(STATE_FILE, 'w') as f:
+        json.dump(state, f, indent=4)
+
+
+def copy_query_to_csv(conn, query, path):
+    """
+    Bulk-export a query with COPY ... TO STDOUT into a CSV file.
+    The server streams CSV text directly, skipping per-row Python conversion.
+    Returns the number of rows copied (reported by the server for COPY).
+    """
+    cursor = conn.cursor()
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER true)", f)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def fetch_incremental(conn, table_name, watermark_column=None):
+    """
+    Fetch only rows whose watermark column is above the stored high-watermark.
+    The upper bound is snapshotted first so rows committed mid-copy are picked
+    up next run rather than skipped. Returns the new CSV path or None.
+    """
+    state = load_watermarks().get(table_name, {})
+    watermark_column = watermark_column or state.get("column")
+    if not watermark_column:
+        print(f"❌ No watermark column for {table_name}. Use --watermark <column>.")
+        return None
+    # Resuming with a different column makes the stored value meaningless
+    last_value = state.get("value") if state.get("column") == watermark_column else None
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MAX({watermark_column}) FROM {table_name}")
+    upper = cursor.fetchone()[0]
+    if upper is None:
+        print(f"💤 {table_name} is empty.")
+        cursor.close()
+        return None
+
+    if last_value is None:
+        where = cursor.mogrify(f"{watermark_column} <= %s", (upper,)).decode()
+    else:
+        where = cursor.mogrify(f"{watermark_column} > %s AND {watermark_column} <= %s",
+                               (last_value, upper)).decode()
+    cursor.close()
+
+    since = f"{watermark_column} > {last_value}" if last_value is not None else "initial load"
+    print(f"📥 Incremental fetch: {table_name} ({since})...")
+    RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    # Microseconds keep back-to-back runs from overwriting an unprocessed file
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    path = RAW_DATA_DIR / f"{table_name}_{timestamp}_incr.csv"
+    part_path = Path(str(path) + ".part")
+
+    start = time.perf_counter()
+    query = f"SELECT * FROM {table_name} WHERE {where} ORDER BY {watermark_column}"
+    # The row count comes back with the COPY itself; no separate COUNT(*) over the range
+    try:
+        rows = copy_query_to_csv(conn, query, part_path)
+    except Exception:
+        part_path.unlink(missing_ok=True)
+        raise
+    elapsed = time.perf_counter() - start
+
+    if rows == 0:
+        part_path.unlink()
+        print(f"💤 No new rows in {table_name} since {watermark_column} = {last_value}.")
+        return None
+    os.replace(part_path, path)
+
+    # Only advance the watermark once the file is safely in place
+    save_watermark(table_name, watermark_column, upper)
+    rate = rows / elapsed if elapsed > 0 else 0
+    print(f"💾 Saved {path.name}: {rows:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/sec). Watermark → {upper}")
+    return path
+
+
+def benchmark_fetch(conn, table_name):
+    """Time the full fetch_table + Excel export path against a COPY export of the same table."""
+    with tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        df = fetch_table(conn, table_name)
+        df.to_excel(os.path.join(tmp, "baseline.xlsx"), index=False, engine='openpyxl')
+        baseline = time.perf_counter() - start
+
+        start = time.perf_counter()
+        copy_query_to_csv(conn, f"SELECT * FROM {table_name}", os.path.join(tmp, "copy.csv"))
+        copied = time.perf_counter() - start
+
+    print(f"\n⏱️  fetch_table + xlsx: {baseline:.2f}s | COPY to csv: {copied:.2f}s "
+          f"| speedup x{baseline / copied if copied > 0 else float('inf'):.1f} ({len(df):,} rows)")
+    return baseline, copied
+
+
+def split_key_ranges(conn, table_name, key_column, parts):
+    """Split an integer key column into `parts` contiguous inclusive ranges."""
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT MIN({key_column}), MAX({key_column}) FROM {table_name}")
+    low, high = cursor.fetchone()
+    cursor.close()
+
+    if low is None:
+        return []
+    if not isinstance(low, int) or not isinstance(high, int):
+        raise ValueError(f"Range splitting needs an integer key column; {key_column} is {type(low).__name__}")
+
+    step = max(1, -(-(high - low + 1) // parts))  # ceiling division
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+
+def fetch_job_to_csv(pool, table_name, part, timestamp, key_column=None, key_range=None):
+    """
+    Copy one table (or one key range of it) into its own CSV shard using a pooled connection.
+    The shard is left under its .part name; fetch_parallel publishes a table's
+    shards together once all of them have succeeded.
+    """
+    conn = pool.getconn()
+    try:
+        query = f"SELECT * FROM {table_name}"
+        if key_range is not None:
+            cursor = conn.cursor()
+            query += cursor.mogrify(f" WHERE {key_column} BETWEEN %s AND %s", key_range).decode()
+            cursor.close()
+
+        path = RAW_DATA_DIR / f"{table_name}_{timestamp}_part{part:04d}.csv"
+        part_path = Path(str(path) + ".part")
+        start = time.perf_counter()
+        try:
+            copy_query_to_csv(conn, query, part_path)
+        except Exception:
+            part_path.unlink(missing_ok=True)
+            raise
+        return path, time.perf_counter() - start
+    finally:
+        pool.putconn(conn)
+
+
+def fetch_parallel(table_names, workers=PARALLEL_WORKERS, split_column=None, ranges=1):
+    """
+    Fetch several tables, and optionally key ranges of each, concurrently.
+    Each job borrows a connection from a pool and writes its own CSV shard.
+    Threads are enough here: the work is DB/network bound and psycopg2
+    releases the GIL while waiting on the server.
+    A table's shards only land in raw_data/incoming/ once every one of them
+    succeeded; if any range fails, its siblings are deleted, so the processor
+    never loads part of a table.
+    Returns (files, failed_tables).
+    """
+    RAW_DATA_DIR.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    pool = ThreadedConnectionPool(1, workers, **PG_CONFIG)
+
+    try:
+        # Plan jobs: one per table, or one per key range when splitting
+        jobs = []
+        for table_name in table_names:
+            key_ranges = [None]
+            if split_column and ranges > 1:
+                conn = pool.getconn()
+                try:
+                    key_ranges = split_key_ranges(conn, table_name, split_column, ranges) or [None]
+                finally:
+                    pool.putconn(conn)
+            for part, key_range in enumerate(key_ranges, start=1):
+                jobs.append((table_name, part, key_range))
+
+        print(f"📥 Fetching {len(jobs)} job(s) across {len(table_names)} table(s) with {workers} worker(s)...")
+        shards = {table_name: [] for table_name in table_names}
+        failed = set()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(fetch_job_to_csv, pool, table_name, part, timestamp,
+                                split_column if key_range else None, key_range): (table_name, part)
+                for table_name, part, key_range in jobs
+            }
+            for future in as_completed(futures):
+                table_name, part = futures[future]
+                try:
+                    path, elapsed = future.result()
+                    shards[table_name].append(path)
+                    print(f"   💾 {path.name} ({elapsed:.1f}s)")
+                except Exception as e:
+                    failed.add(table_name)
+                    print(f"   ❌ {table_name} part {part} failed: {e}")
+
+        # Publish complete tables; drop every shard of a table with a failed range
+        files = []
+        for table_name, paths in shards.items():
+            for path in paths:
+                part_path = str(path) + ".part"
+                if table_name in failed:
+                    os.remove(part_path)
+                else:
+                    os.replace(part_path, path)
+                    files.append(path)
+        for table_name in sorted(failed):
+            print(f"   🗑️  Discarded {len(shards[table_name])} completed shard(s) of {table_name}")
+
+        done = sum(len(paths) for paths in shards.values())
+        print(f"   Completed {done}/{len(jobs)} job(s) in {time.perf_counter() - start:.1f}s")
+        return sorted(files), sorted(failed)
+    finally:
+        pool.closeall()
+
+
 def list_tables(conn):
     """List all available tables in the database."""
     query = """
@@ -101,12 +512,39 @@ def list_tables(conn):
 
 def main():
     parser = argparse.ArgumentParser(description="Fetch PostgreSQL table to Excel")
-    parser.add_argument("--table", "-t", help="Table name to fetch")
+    parser.add_argument("--table", "-t", nargs="+", help="Table name(s) to fetch")
     parser.add_argument("--list", "-l", action="store_true", help="List available tables")
+    parser.add_argument("--all", "-a", action="store_true", help="Fetch every table from --list in parallel")
+    parser.add_argument("--workers", type=int, default=PARALLEL_WORKERS,
+                        help="Concurrent connections for multi-table / range fetches")
+    parser.add_argument("--split-column", help="Integer key column used to split tables into ranges")
+    parser.add_argument("--ranges", type=int, default=PARALLEL_WORKERS,
+                        help="Number of key ranges per table with --split-column")
+    parser.add_argument("--stream", "-s", action="store_true",
+                        help="Stream via a server-side cursor into fixed-size shards")
+    parser.add_argument("--format", "-f", choices=["csv", "parquet", "xlsx"], default="csv",
+                        help="Shard file format for --stream")
+    parser.add_argument("--shard-rows", type=int, default=STREAM_SHARD_ROWS, help="Rows per shard for --stream")
+    parser.add_argument("--itersize", type=int, default=STREAM_ITERSIZE,
+                        help="Rows fetched per server round-trip for --stream")
+    parser.add_argument("--incremental", "-i", action="store_true",
+                        help="Fetch only rows above the stored high-watermark (uses COPY)")
+    parser.add_argument("--watermark", "-w", default=os.getenv("PG_WATERMARK_COLUMN", ""),
+                        help="Monotonic column for --incremental (e.g. updated_at or id)")
+    parser.add_argument("--benchmark", action="store_true", help="Compare fetch_table against COPY export")
     args = parser.parse_args()
+
+    parallel = args.all or (args.table and len(args.table) > 1) or args.split_column
+    if parallel:
+        single_only = [flag for flag, used in (("--incremental", args.incremental), ("--stream", args.stream),
+                                               ("--benchmark", args.benchmark)) if used]
+        if single_only:
+            parser.error(f"{', '.join(single_only)} fetch a single table; "
+                         "they can't be combined with several tables, --all or --split-column")
     
-    # Get table name
-    table_name = args.table or os.getenv("PG_TABLE", "")
+    # Get table name(s)
+    table_names = args.table or [t for t in [os.getenv("PG_TABLE", "")] if t]
+    table_name = table_names[0] if table_names else ""
     
     # Connect
     conn = connect_postgres()
@@ -117,14 +555,51 @@ def main():
         conn.close()
         return
     
+    if args.all:
+        table_names = list_tables(conn)
+    
     # Validate table name
-    if not table_name:
+    if not table_names:
         print("❌ No table specified. Use --table <name> or set PG_TABLE in .env")
         list_tables(conn)
         conn.close()
         sys.exit(1)
     
     # Fetch and export
+    if parallel:
+        conn.close()
+        files, failed = fetch_parallel(table_names, workers=args.workers,
+                                       split_column=args.split_column, ranges=args.ranges)
+        if failed:
+            print(f"\n❌ FAILED: {', '.join(failed)} ({len(files)} file(s) from other tables ready for processing).")
+            sys.exit(1)
+        if files:
+            print(f"\n✅ SUCCESS! {len(files)} file(s) ready for processing.")
+            print(f"   Run: python main.py")
+        return
+
+    if args.benchmark:
+        benchmark_fetch(conn, table_name)
+        conn.close()
+        return
+
+    if args.incremental:
+        output_file = fetch_incremental(conn, table_name, args.watermark or None)
+        if output_file:
+            print(f"\n✅ SUCCESS! Data ready for processing.")
+            print(f"   Run: python main.py")
+        conn.close()
+        return
+
+    if args.stream:
+        files = stream_table(conn, table_name, fmt=args.format,
+                             shard_rows=args.shard_rows, itersize=args.itersize)
+        if files:
+            print(f"\n✅ SUCCESS! {len(files)} shard(s) ready for processing.")
+            print(f"   Run: python main.py")
+        conn.close()
+        return
+
     df = fetch_table(conn, table_name)
     
     if not df.empty:
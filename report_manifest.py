@@ -0,0 +1,117 @@
+import os
+import re
+import json
+import hashlib
+import pandas as pd
+import config
+from datetime import date
+from pathlib import Path
+from date_index import week_label
+
+MIGRATION_MARKER = ".iso_weeks"  # Present once a reports dir has been moved to ISO week folders
+REPORT_NAME = re.compile(r"^Bank_Report_(\d{4}-\d{2}-\d{2})\.xlsx$")
+
+
+class ReportManifest:
+    """
+    Records what each daily report file was built from (row count and a
+    content hash of the day's rows), so a day whose rows haven't changed
+    can be skipped instead of rewritten.
+    """
+    def __init__(self, path=None):
+        self.path = path or config.OUTPUT_DIR / "daily_reports_manifest.json"
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def content_hash(df):
+        """Order-sensitive hash of a day's rows (values only, index ignored)."""
+        row_hashes = pd.util.hash_pandas_object(df, index=False).values
+        digest = hashlib.sha1(row_hashes.tobytes())
+        digest.update("|".join(map(str, df.columns)).encode())
+        return digest.hexdigest()
+
+    def is_current(self, date_str, filepath, rows, digest):
+        entry = self.entries.get(date_str)
+        return (
+            entry is not None
+            and entry["rows"] == rows
+            and entry["hash"] == digest
+            and entry["file"] == str(filepath)
+            and filepath.exists()
+        )
+
+    def remove_stale_file(self, date_str, filepath):
+        """
+        Deletes a day's previous file when it is about to be written elsewhere
+        (e.g. moved from a legacy %W week folder to its ISO week folder).
+        """
+        entry = self.entries.get(date_str)
+        if entry is None or entry["file"] == str(filepath):
+            return
+        old_path = Path(entry["file"])
+        if old_path.exists():
+            old_path.unlink()
+            if not any(old_path.parent.iterdir()):
+                old_path.parent.rmdir()
+
+    def record(self, date_str, filepath, rows, digest):
+        self.entries[date_str] = {"file": str(filepath), "rows": rows, "hash": digest}
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+
+
+def migrate_week_folders(reports_dir=None, manifest=None):
+    """
+    One-off move of daily reports from legacy %W week folders into their ISO
+    week folders. Legacy names look like ISO labels ("2024-W05" can hold days
+    of ISO weeks 05 and 06), so every file is checked against the ISO week of
+    its own date rather than trusting the folder name. When a day exists in
+    both places, the copy the manifest records is kept (else the newer one),
+    so no day is left duplicated. Emptied folders are removed; a marker file
+    makes later calls a no-op. Returns the number of files moved or dropped.
+    """
+    reports_dir = reports_dir or config.OUTPUT_DIR / "daily_reports"
+    marker = reports_dir / MIGRATION_MARKER
+    if marker.exists() or not reports_dir.exists():
+        return 0
+
+    manifest = manifest or ReportManifest()
+    changed = 0
+    for path in sorted(reports_dir.glob("*/Bank_Report_*.xlsx")):
+        match = REPORT_NAME.match(path.name)
+        if not match:
+            continue
+        date_str = match.group(1)
+        target = reports_dir / week_label(date.fromisoformat(date_str)) / path.name
+        if target == path:
+            continue
+
+        entry = manifest.entries.get(date_str)
+        if target.exists():
+            recorded = entry is not None and entry["file"] == str(target)
+            if recorded or (entry is None and target.stat().st_mtime_ns >= path.stat().st_mtime_ns):
+                path.unlink()  # Keep the ISO copy
+            else:
+                os.replace(path, target)
+        else:
+            target.parent.mkdir(exist_ok=True)
+            os.replace(path, target)
+        if entry is not None and entry["file"] == str(path):
+            entry["file"] = str(target)
+        changed += 1
+
+    for folder in reports_dir.iterdir():
+        if folder.is_dir() and not any(folder.iterdir()):
+            folder.rmdir()
+
+    if changed:
+        manifest.save()
+        config.logger.info(f"Migrated {changed} daily reports from legacy week folders to ISO weeks")
+        print(f"🗂️  Moved {changed} daily reports into ISO week folders.")
+    marker.touch()
+    return changed
@@ -0,0 +1,131 @@
+import os
+import json
+import argparse
+from datetime import datetime
+import pandas as pd
+import config
+from parquet_store import ParquetMasterStore
+
+ROLLUP_KEYS = ['Transaction_Date', 'Branch', 'Transaction_Type']
+
+
+def summarize(df):
+    """Daily Amount total and row count per branch and type for one batch of clean rows."""
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_KEYS + ['Amount', 'Count'])
+    keys = [
+        pd.to_datetime(df['Transaction_Date']).dt.normalize().rename('Transaction_Date'),
+        df['Branch'].astype(str).rename('Branch'),
+        df['Transaction_Type'].astype(str).rename('Transaction_Type'),
+    ]
+    grouped = df['Amount'].groupby(keys, dropna=False)
+    return grouped.agg(Amount='sum', Count='size').reset_index()
+
+
+class RollupStore:
+    """
+    Materialized aggregates of the master data, kept tiny so the dashboard never
+    touches raw rows:
+    - daily.parquet: Transaction_Date x Branch x Transaction_Type -> Amount, Count
+    - kpis.json: overall totals, average and date span
+    Batches are summarized as they are written and merged on flush, so the cost
+    of an update depends on the batch, not on the history.
+    """
+    def __init__(self, root=None):
+        self.root = root or config.ROLLUP_DIR
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.daily_file = self.root / "daily.parquet"
+        self.kpi_file = self.root / "kpis.json"
+        self._pending = []
+
+    def exists(self):
+        return self.daily_file.exists() and self.kpi_file.exists()
+
+    def add(self, df):
+        """Summarize one batch of clean rows; merged into the store on flush()."""
+        if not df.empty:
+            self._pending.append(summarize(df))
+        if len(self._pending) >= 64:  # Keep long runs of small chunks compact
+            merged = pd.concat(self._pending, ignore_index=True)
+            self._pending = [merged.groupby(ROLLUP_KEYS, dropna=False, as_index=False)[['Amount', 'Count']].sum()]
+
+    def daily(self):
+        if not self.daily_file.exists():
+            return pd.DataFrame(columns=ROLLUP_KEYS + ['Amount', 'Count'])
+        return pd.read_parquet(self.daily_file)
+
+    def kpis(self):
+        if not self.kpi_file.exists():
+            return None
+        with open(self.kpi_file, 'r') as f:
+            return json.load(f)
+
+    def flush(self, replace=False):
+        """
+        Merge pending summaries into the stored rollup (or replace it) and refresh the KPIs.
+        Without a stored rollup to merge into, the pending batch is not the whole
+        history, so the rollup is rebuilt from the master data instead; callers
+        must have written the batch to the master CSV/Parquet store first.
+        """
+        if not self._pending and not replace:
+            return
+        if not replace and not self.exists():
+            self._pending = []
+            self.rebuild()
+            return
+        frames = self._pending if replace else [self.daily()] + self._pending
+        frames = [f for f in frames if not f.empty]
+        self._pending = []
+        if frames:
+            merged = pd.concat(frames, ignore_index=True)
+            daily = merged.groupby(ROLLUP_KEYS, dropna=False, as_index=False)[['Amount', 'Count']].sum()
+        else:
+            daily = pd.DataFrame(columns=ROLLUP_KEYS + ['Amount', 'Count'])
+        self._write(daily)
+
+    def _write(self, daily):
+        count = int(daily['Count'].sum()) if not daily.empty else 0
+        volume = float(daily['Amount'].sum()) if not daily.empty else 0.0
+        kpis = {
+            "total_transactions": count,
+            "total_volume": volume,
+            "avg_transaction": volume / count if count else 0.0,
+            "first_date": str(daily['Transaction_Date'].min().date()) if count else None,
+            "last_date": str(daily['Transaction_Date'].max().date()) if count else None,
+            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+        # Write-then-rename so the dashboard never reads a half-written rollup
+        tmp_daily = self.daily_file.with_name(self.daily_file.name + ".tmp")
+        daily.to_parquet(tmp_daily, index=False)
+        os.replace(tmp_daily, self.daily_file)
+        tmp_kpis = self.kpi_file.with_name(self.kpi_file.name + ".tmp")
+        with open(tmp_kpis, 'w') as f:
+            json.dump(kpis, f, indent=2)
+        os.replace(tmp_kpis, self.kpi_file)
+
+    def rebuild(self, chunksize=500_000):
+        """Recomputes the rollups from the whole master dataset (first run or repair)."""
+        columns = ROLLUP_KEYS + ['Amount']
+        store = ParquetMasterStore()
+        if config.PARQUET_STORE_ENABLED and store.exists():
+            self.add(store.read(columns=columns))
+        else:
+            master_csv = config.OUTPUT_DIR / "master_clean_data.csv"
+            if master_csv.exists():
+                for chunk in pd.read_csv(master_csv, usecols=columns, chunksize=chunksize):
+                    self.add(chunk)
+        self.flush(replace=True)
+        kpis = self.kpis()
+        config.logger.info(f"Rebuilt rollups: {kpis['total_transactions']} transactions")
+        return kpis
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dashboard rollups over the master data")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute rollups from the full master data")
+    args = parser.parse_args()
+    store = RollupStore()
+    if args.rebuild or not store.exists():
+        store.rebuild()
+    print(json.dumps(store.kpis(), indent=2))
@@ -0,0 +1,125 @@
+import sys
+import pandas as pd
+import config
+from excel_generator import regenerate_days
+from parquet_store import CsvMonthBuckets
+from rollups import RollupStore
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None if the platform can't tell us)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    # Windows: psutil exposes the peak working set
+    try:
+        import psutil
+    except ImportError:
+        return None
+    peak = getattr(psutil.Process().memory_info(), "peak_wset", None)
+    return peak / (1024 * 1024) if peak is not None else None
+
+
+class StreamingWriter:
+    """
+    Streams cleaned chunks to the master outputs in bounded batches and
+    remembers which days they touched. Chunks are buffered (up to
+    STREAM_FLUSH_ROWS or the memory limit) and each flush writes the batch to
+    the master CSV, the Parquet store and the dashboard rollups (see
+    rollups.py) together, so callers that checkpoint after a flush never leave
+    one output ahead of another. On close, only the dirty days are
+    regenerated, each from all of its rows in the master store.
+    """
+    def __init__(self, output_path=None, overwrite=False, generate_reports=True, memory_limit_mb=None,
+                 parquet_store=None, update_rollups=True):
+        self.output_path = output_path or config.OUTPUT_DIR / "master_clean_data.csv"
+        self.generate_reports = generate_reports
+        self.parquet_store = parquet_store
+        self.memory_limit = (memory_limit_mb or config.STREAM_MEMORY_LIMIT_MB) * 1024 * 1024
+        self.rows_written = 0
+        self.dirty_days = set()
+        self._truncate = overwrite  # Replace the file on first write instead of appending
+        self._replace_rollups = overwrite
+        self.rollups = RollupStore() if update_rollups else None
+        self._buffer = []
+        self._buffer_rows = 0
+        self._buffer_bytes = 0
+
+    def write(self, df):
+        """
+        Buffer one cleaned chunk and mark its days dirty. Returns True when this
+        call flushed, i.e. every row written so far is in all outputs.
+        """
+        if df.empty:
+            return False
+
+        self._buffer.append(df)
+        self._buffer_rows += len(df)
+        self._buffer_bytes += df.memory_usage(deep=True).sum()
+
+        if self.generate_reports and 'Transaction_Date' in df.columns:
+            days = pd.to_datetime(df['Transaction_Date']).dt.date.dropna().unique()
+            self.dirty_days.update(days)
+
+        if self._buffer_rows >= config.STREAM_FLUSH_ROWS or self._buffer_bytes > self.memory_limit:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """
+        Write buffered rows to the master CSV, the Parquet store and the rollups,
+        in that order: a rollup without history is rebuilt from the master data.
+        """
+        replace_rollups = False
+        if self._buffer:
+            df = pd.concat(self._buffer, ignore_index=True)
+            self._buffer = []
+            self._buffer_rows = 0
+            self._buffer_bytes = 0
+
+            header = self._truncate or not self.output_path.exists()
+            mode = 'w' if self._truncate else 'a'
+            df.to_csv(self.output_path, mode=mode, header=header, index=False)
+
+            if self.parquet_store is not None:
+                if self._truncate:
+                    self.parquet_store.clear()  # Rewritten along with the CSV
+                self.parquet_store.append(df)
+            self._truncate = False
+            if self.rollups is not None:
+                self.rollups.add(df)
+            self.rows_written += len(df)
+            # The rollups are replaced together with the first write that truncates the CSV
+            replace_rollups, self._replace_rollups = self._replace_rollups, False
+
+        if self.rollups is not None:
+            self.rollups.flush(replace=replace_rollups)
+
+    def close(self):
+        """Flush buffers, regenerate dirty days and report the run's peak memory."""
+        self.flush()
+
+        if self.generate_reports and self.dirty_days:
+            # Days are regenerated from the store we write to. The CSV has no
+            # month index, so it is split by month in one pass, not rescanned per month.
+            if self.parquet_store is not None:
+                store = self.parquet_store
+                regenerate_days(self.dirty_days, lambda start, end: store.read(start_date=start, end_date=end))
+            else:
+                months = {(day.year, day.month) for day in self.dirty_days}
+                with CsvMonthBuckets(self.output_path, months) as buckets:
+                    regenerate_days(self.dirty_days, buckets.read_range)
+            self.dirty_days = set()
+
+        peak = peak_rss_mb()
+        if peak is not None:
+            config.logger.info(f"StreamingWriter: {self.rows_written} rows written, peak RSS {peak:.1f} MB")
+            print(f"📈 Peak RSS: {peak:.1f} MB")
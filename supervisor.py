@@ -1,99 +1,227 @@
 import time
+import json
+import argparse
+import importlib
+import multiprocessing
 import subprocess
 import config
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 
-import pandas as pd
-from datetime import datetime
+from audit_log import AuditLog
+from incoming_watcher import IncomingWatcher
 
 # --- Settings ---
 FEEDER_INTERVAL = 60  # 1 minute
 PROCESSOR_INTERVAL = 60 # 1 minute
-AUDIT_FILE = config.OUTPUT_DIR / "supervisor_audit.xlsx"
+
+_audit = None
 
 def log_audit(event_type, script_name, details):
-    """Logs supervisor events to an Excel file."""
-    new_entry = {
-        "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-        "Event": event_type,
-        "Script": script_name,
-        "Details": details
-    }
-    
+    """Appends a supervisor event to the audit trail (see audit_log.py)."""
+    global _audit
     try:
-        if AUDIT_FILE.exists():
-            df = pd.read_excel(AUDIT_FILE)
-            df = pd.concat([df, pd.DataFrame([new_entry])], ignore_index=True)
-        else:
-            df = pd.DataFrame([new_entry])
-            
-        df.to_excel(AUDIT_FILE, index=False)
+        if _audit is None:
+            _audit = AuditLog()
+        _audit.write(event_type, script_name, details)
     except Exception as e:
         print(f"⚠️  Failed to write to audit log: {e}")
 
+# name -> (module, entry point, script, interval in seconds)
+# Feeder and processors hand files over via file_handoff, so they can run concurrently
+JOBS = {
+    "data_feeder": ("data_feeder", "generate_chunk", "data_feeder.py", FEEDER_INTERVAL),
+    "data_processor": ("data_processor", "process_new_data", "data_processor.py", PROCESSOR_INTERVAL),
+}
+for i in range(2, config.SUPERVISOR_PROCESSOR_INSTANCES + 1):
+    JOBS[f"data_processor#{i}"] = JOBS["data_processor"]
+MODES = ("inprocess", "pool", "subprocess")
+WATCH_JOB = "data_processor"  # In watch mode this job (and its #N instances) runs on file arrival instead of its interval
+METRICS_FILE = config.OUTPUT_DIR / "supervisor_metrics.json"
+
+
 def run_script(script_name):
-    """Runs a script and waits for it to finish."""
+    """Runs a script in a fresh interpreter; raises RuntimeError on a non-zero exit."""
     script_path = config.BASE_DIR / script_name
-    print(f"[{datetime.now().strftime('%H:%M:%S')}] 🚀 Supervisor: Starting {script_name}...")
-    config.logger.info(f"Supervisor: Starting {script_name}")
-    log_audit("START", script_name, "Attempting run")
-    
+    # Use sys.executable to ensure we use the same python interpreter
+    result = subprocess.run([sys.executable, str(script_path)], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+
+
+def run_inprocess(module_name, func_name):
+    """Calls a job's entry point; the module is imported once and stays loaded."""
+    module = importlib.import_module(module_name)
+    getattr(module, func_name)()
+
+
+def _warm_imports(module_names):
+    """Pool initializer: pay the pandas/config import cost once per worker."""
+    for name in module_names:
+        importlib.import_module(name)
+
+
+def execute_job(mode, module_name, func_name, script_name):
+    """Runs one job in the given mode and returns its duration in seconds."""
+    start = time.perf_counter()
     try:
-        # Use sys.executable to ensure we use the same python interpreter
-        result = subprocess.run([sys.executable, str(script_path)], capture_output=True, text=True)
-        
-        if result.returncode == 0:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ {script_name} finished successfully.")
-            config.logger.info(f"Supervisor: {script_name} success.")
-            log_audit("SUCCESS", script_name, "Completed with exit code 0")
+        if mode == "subprocess":
+            run_script(script_name)
         else:
-            print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ {script_name} failed!")
-            print(f"Error Output:\n{result.stderr}")
-            config.logger.error(f"Supervisor: {script_name} failed. Error: {result.stderr}")
-            log_audit("FAILURE", script_name, f"Error: {result.stderr[:200]}...") # Truncate error for excel
+            run_inprocess(module_name, func_name)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"exited with code {e.code}")
+    return time.perf_counter() - start
 
-    except Exception as e:
-        print(f"[{datetime.now().strftime('%H:%M:%S')}] 💥 Supervisor: Critical Error running {script_name}: {e}")
-        config.logger.critical(f"Supervisor: Critical Error running {script_name}: {e}")
-        log_audit("CRITICAL_ERROR", script_name, str(e))
-
-def supervisor_loop():
-    print("👮 Supervisor System Started.")
-    print(f"   Feeder Interval: {FEEDER_INTERVAL}s")
-    print(f"   Processor Interval: {PROCESSOR_INTERVAL}s")
-    print("   Press Ctrl+C to stop.")
-    
-    last_feeder_run = 0
-    last_processor_run = 0
-    
-    while True:
+
+class Scheduler:
+    """
+    Runs jobs on per-job intervals without spawning a new interpreter each time.
+    A job never overlaps with its own previous run, and at most max_concurrent
+    jobs run at once. Modes:
+    - inprocess: jobs run in threads of this process (imports stay warm)
+    - pool: jobs run in long-lived worker processes (warm, but isolated from the supervisor)
+    - subprocess: the original behaviour, a fresh interpreter per run
+    With watch=True the processor is triggered by files landing in incoming/.
+    """
+    def __init__(self, jobs=None, mode=None, max_concurrent=None, watch=False):
+        self.jobs = jobs or JOBS
+        self.mode = mode or config.SUPERVISOR_MODE
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown supervisor mode: {self.mode} (expected one of {MODES})")
+        self.max_concurrent = max_concurrent or config.SUPERVISOR_MAX_CONCURRENT
+        self.last_start = {name: 0 for name in self.jobs}
+        self.running = {}  # future -> (job name, wall-clock start)
+        self.watcher = IncomingWatcher() if watch else None
+        self.watched = {name for name in self.jobs if name.split("#")[0] == WATCH_JOB} if watch else set()
+        self.triggered = set()  # Watched jobs with a file batch waiting for them
+        self.metrics = {
+            name: {"runs": 0, "failures": 0, "last_seconds": None, "total_seconds": 0.0, "max_seconds": 0.0}
+            for name in self.jobs
+        }
+
+    def _executor(self):
+        if self.mode == "pool":
+            modules = [module for module, _, _, _ in self.jobs.values()]
+            return ProcessPoolExecutor(max_workers=self.max_concurrent, initializer=_warm_imports, initargs=(modules,))
+        return ThreadPoolExecutor(max_workers=self.max_concurrent)
+
+    def _due_jobs(self, now):
+        busy = {name for name, _ in self.running.values()}
+        for name, (_, _, _, interval) in self.jobs.items():
+            if name in busy:
+                continue
+            if name in self.watched:
+                if name in self.triggered:
+                    yield name
+            elif now - self.last_start[name] >= interval:
+                yield name
+
+    def _submit(self, executor, name):
+        module_name, func_name, script_name, _ = self.jobs[name]
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] 🚀 Supervisor: Starting {name} ({self.mode})...")
+        config.logger.info(f"Supervisor: Starting {name} ({self.mode})")
+        log_audit("START", script_name, f"Attempting run ({self.mode})")
+        self.last_start[name] = time.time()
+        self.triggered.discard(name)
+        future = executor.submit(execute_job, self.mode, module_name, func_name, script_name)
+        self.running[future] = (name, time.perf_counter())
+
+    def _collect(self, future):
+        name, started = self.running.pop(future)
+        script_name = self.jobs[name][2]
+        stats = self.metrics[name]
         try:
-            now = time.time()
-            
-            # Check Feeder
-            if now - last_feeder_run >= FEEDER_INTERVAL:
-                run_script("data_feeder.py")
-                last_feeder_run = time.time()
-            
-            # Check Processor
-            # We check time again to avoid drifting if feeder takes long
-            now = time.time() 
-            if now - last_processor_run >= PROCESSOR_INTERVAL:
-                run_script("data_processor.py")
-                last_processor_run = time.time()
-                
-            # Sleep briefly to avoid CPU spin
-            time.sleep(1)
-            
-        except KeyboardInterrupt:
-            print("\n🛑 Supervisor stopped by user.")
-            break
+            seconds = future.result()
         except Exception as e:
-            print(f"⚠️  Supervisor Loop Error: {e}")
-            config.logger.error(f"Supervisor Loop Error: {e}")
-            time.sleep(5) # Wait a bit before retrying loop
+            seconds = time.perf_counter() - started
+            stats["failures"] += 1
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ❌ {name} failed after {seconds:.2f}s!")
+            print(f"Error Output:\n{e}")
+            config.logger.error(f"Supervisor: {name} failed. Error: {e}")
+            log_audit("FAILURE", script_name, f"Error: {str(e)[:200]}...")  # Truncate error for excel
+        else:
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ {name} finished successfully in {seconds:.2f}s.")
+            config.logger.info(f"Supervisor: {name} success in {seconds:.2f}s.")
+            log_audit("SUCCESS", script_name, f"Completed in {seconds:.2f}s")
+        stats["runs"] += 1
+        stats["last_seconds"] = round(seconds, 3)
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+        self._save_metrics()
+
+    def _save_metrics(self):
+        with open(METRICS_FILE, 'w') as f:
+            json.dump({"mode": self.mode, "jobs": self.metrics}, f, indent=2)
+
+    def print_metrics(self):
+        print("\n⏱️  Job timings:")
+        for name, stats in self.metrics.items():
+            avg = stats["total_seconds"] / stats["runs"] if stats["runs"] else 0.0
+            print(f"   {name}: {stats['runs']} runs, {stats['failures']} failed, "
+                  f"avg {avg:.2f}s, max {stats['max_seconds']:.2f}s")
+
+    def run(self):
+        print(f"👮 Supervisor System Started ({self.mode} mode, max {self.max_concurrent} concurrent).")
+        for name, (_, _, _, interval) in self.jobs.items():
+            if name in self.watched:
+                print(f"   {name}: on file arrival ({self.watcher.backend})")
+            else:
+                print(f"   {name} interval: {interval}s")
+        print("   Press Ctrl+C to stop.")
+
+        executor = self._executor()
+        try:
+            while True:
+                try:
+                    if self.watcher and self.watcher.poll():
+                        self.triggered = set(self.watched)
+                    for name in self._due_jobs(time.time()):
+                        if len(self.running) >= self.max_concurrent:
+                            break
+                        self._submit(executor, name)
+
+                    # Wait for a job to finish (or 1s) instead of spinning
+                    if self.running:
+                        done, _ = wait(list(self.running), timeout=1, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._collect(future)
+                    else:
+                        time.sleep(1)
+
+                except KeyboardInterrupt:
+                    print("\n🛑 Supervisor stopped by user.")
+                    break
+                except Exception as e:
+                    print(f"⚠️  Supervisor Loop Error: {e}")
+                    config.logger.error(f"Supervisor Loop Error: {e}")
+                    time.sleep(5) # Wait a bit before retrying loop
+        finally:
+            if self.running:
+                print("   Waiting for running jobs to finish...")
+            executor.shutdown(wait=True, cancel_futures=True)
+            if self.watcher:
+                self.watcher.stop()
+            for future in list(self.running):
+                self._collect(future)
+            self.print_metrics()
+
+
+def supervisor_loop(mode=None, max_concurrent=None, watch=False):
+    Scheduler(mode=mode, max_concurrent=max_concurrent, watch=watch).run()
+
 
 if __name__ == "__main__":
-    supervisor_loop()
+    parser = argparse.ArgumentParser(description="Run the feeder and processor on a schedule")
+    parser.add_argument("--mode", choices=MODES, default=config.SUPERVISOR_MODE,
+                        help="inprocess/pool keep imports warm; subprocess isolates every run")
+    parser.add_argument("--max-concurrent", type=int, default=config.SUPERVISOR_MAX_CONCURRENT,
+                        help="Jobs allowed to run at the same time")
+    parser.add_argument("--watch", action="store_true",
+                        help="Run the processor when files land in incoming/ instead of every PROCESSOR_INTERVAL")
+    args = parser.parse_args()
+    multiprocessing.freeze_support()
+    supervisor_loop(mode=args.mode, max_concurrent=args.max_concurrent, watch=args.watch)
@@ -1,110 +1,248 @@
 import shutil
 import os
+import json
+import tarfile
+import zipfile
 import config
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import glob
 from pathlib import Path
+from date_index import DateIndex
+from report_manifest import migrate_week_folders
+
+ZIP_COMPRESSION = {
+    "deflate": zipfile.ZIP_DEFLATED,
+    "stored": zipfile.ZIP_STORED,  # No recompression: right for nesting already-compressed files
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+
+def _write_tar_zst(archive_path, sources, level, threads=-1):
+    """
+    Writes sources into a zstd-compressed tar (needs the optional zstandard package).
+    threads=-1 uses every core; pass 1 when several archives are built concurrently.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("ARCHIVE_FORMAT 'tar.zst' requires the zstandard package (pip install zstandard)")
+
+    with open(archive_path, 'wb') as raw:
+        with zstandard.ZstdCompressor(level=level, threads=threads).stream_writer(raw) as zst:
+            with tarfile.open(fileobj=zst, mode='w|') as tar:
+                for p in sources:
+                    tar.add(p, arcname=p.name)
+
+
+def archive_codec(archive_name, compression):
+    """How an archive's entries are compressed, as recorded in the manifest."""
+    if archive_name.endswith(".zip"):
+        return compression
+    if archive_name.endswith(".tar.zst"):
+        return f"zstd-{config.ARCHIVE_ZSTD_LEVEL}"
+    return "stored"
+
+
+def sync_archive(archive_path, sources, old_sig, compression, zstd_threads=-1):
+    """
+    Brings one archive up to date with its sources, doing the least work:
+    - unchanged sources: nothing
+    - only new sources added: append them to an existing zip in place
+    - anything modified or removed (or a tar archive): rebuild atomically
+    old_sig must be None when the archive was written with another codec, so
+    it is rebuilt rather than mixing compression methods.
+    Runs in worker threads: zlib and zstd release the GIL while compressing.
+    Returns (status, signature) where status is "skipped", "appended" or "rebuilt".
+    """
+    sig = TemporalPackager.signature(sources)
+    if old_sig == sig:
+        return "skipped", sig
+
+    name = archive_path.name
+    if name.endswith(".zip"):
+        method = ZIP_COMPRESSION[compression]
+        if old_sig is not None and all(sig.get(n) == meta for n, meta in old_sig.items()):
+            with zipfile.ZipFile(archive_path, 'a', method) as zf:
+                for p in sources:
+                    if p.name not in old_sig:
+                        zf.write(p, arcname=p.name)
+            return "appended", sig
+
+    tmp_path = archive_path.with_name(name + ".tmp")
+    if name.endswith(".zip"):
+        with zipfile.ZipFile(tmp_path, 'w', ZIP_COMPRESSION[compression]) as zf:
+            for p in sources:
+                zf.write(p, arcname=p.name)
+    elif name.endswith(".tar.zst"):
+        _write_tar_zst(tmp_path, sources, config.ARCHIVE_ZSTD_LEVEL, threads=zstd_threads)
+    else:  # Plain .tar: store-only nesting of .tar.zst archives
+        with tarfile.open(tmp_path, 'w') as tar:
+            for p in sources:
+                tar.add(p, arcname=p.name)
+    os.replace(tmp_path, archive_path)
+    return "rebuilt", sig
+
 
 class TemporalPackager:
-    def __init__(self):
+    def __init__(self, workers=None):
         self.source_dir = config.OUTPUT_DIR / "daily_reports"
         self.weekly_archive_dir = config.OUTPUT_DIR / "weekly_archives"
         self.monthly_archive_dir = config.OUTPUT_DIR / "monthly_archives"
+        self.manifest_file = config.OUTPUT_DIR / "archive_manifest.json"
+        self.workers = workers or config.ARCHIVE_WORKERS
         self.weekly_archive_dir.mkdir(exist_ok=True)
         self.monthly_archive_dir.mkdir(exist_ok=True)
+        self.manifest = self._load_manifest()
+
+        # Weekly: zip (configurable compression) or tar.zst.
+        # Monthly archives nest already-compressed weeklies, so they default to store-only.
+        if config.ARCHIVE_FORMAT == "tar.zst":
+            self.weekly_ext = ".tar.zst"
+            self.monthly_ext = ".tar" if config.ARCHIVE_MONTHLY_COMPRESSION == "stored" else ".tar.zst"
+        else:
+            self.weekly_ext = self.monthly_ext = ".zip"
+
+    def _load_manifest(self):
+        if self.manifest_file.exists():
+            with open(self.manifest_file, 'r') as f:
+                return json.load(f)
+        return {"weeks": {}, "months": {}}
+
+    def _save_manifest(self):
+        with open(self.manifest_file, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+    @staticmethod
+    def signature(paths):
+        """Content key for a set of source files: name -> [mtime_ns, size]."""
+        sig = {}
+        for p in paths:
+            st = p.stat()
+            sig[p.name] = [st.st_mtime_ns, st.st_size]
+        return sig
+
+    def _sync_all(self, section, jobs, compression):
+        """
+        Syncs {key: (archive_path, sources)} across a thread pool and records
+        the new signatures in the manifest. Returns the keys that changed.
+        """
+        def old_sig(key, archive_path):
+            entry = self.manifest[section].get(key)
+            if (entry and entry["archive"] == archive_path.name and archive_path.exists()
+                    and entry.get("codec") == archive_codec(archive_path.name, compression)):
+                return entry["sources"]
+            return None
+
+        # zstd would start a thread per core inside every pool thread; one each is enough
+        zstd_threads = 1 if self.workers > 1 else -1
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                key: pool.submit(sync_archive, path, sources, old_sig(key, path), compression, zstd_threads)
+                for key, (path, sources) in jobs.items()
+            }
+
+        changed = []
+        for key, future in sorted(futures.items()):
+            status, sig = future.result()
+            name = jobs[key][0].name
+            self.manifest[section][key] = {"archive": name, "sources": sig,
+                                           "codec": archive_codec(name, compression)}
+            if status != "skipped":
+                changed.append(key)
+        self._save_manifest()
+        return changed
+
+    def _prune(self, section, archive_dir, keep):
+        """
+        Drops manifest entries (and their archives) whose sources no longer
+        exist, e.g. legacy week folders emptied by the ISO migration.
+        """
+        stale = [key for key in self.manifest[section] if key not in keep]
+        for key in stale:
+            (archive_dir / self.manifest[section].pop(key)["archive"]).unlink(missing_ok=True)
+        if stale:
+            self._save_manifest()
+            config.logger.info(f"Removed {len(stale)} {section} archives without sources: {', '.join(sorted(stale))}")
 
     def package_by_week(self):
         """
-        Creates ZIP archives for each weekly folder.
+        Creates an archive (ZIP or tar.zst) for each weekly folder.
         Structure: daily_reports/2024-W01/ -> weekly_archives/Weekly_Report_2024-W01.zip
+        Only weeks whose daily files changed since the last run are touched.
         """
         config.logger.info("Starting Weekly Packaging...")
+        migrate_week_folders(self.source_dir)
         
         # Find all weekly folders
-        week_folders = [d for d in self.source_dir.iterdir() if d.is_dir()]
+        week_folders = [d for d in self.source_dir.iterdir() if d.is_dir()] if self.source_dir.exists() else []
+        self._prune("weeks", self.weekly_archive_dir, {d.name for d in week_folders})
         
         if not week_folders:
             print("⚠️  No weekly folders to package.")
             return []
 
-        count = 0
-        packaged_weeks = []
-        
+        jobs = {}
         for week_dir in week_folders:
             week_name = week_dir.name  # e.g., "2024-W01"
-            zip_name = self.weekly_archive_dir / f"Weekly_Report_{week_name}"
-            
-            # Create ZIP of the week folder
-            shutil.make_archive(str(zip_name), 'zip', week_dir)
-            packaged_weeks.append(week_name)
-            count += 1
+            archive_path = self.weekly_archive_dir / f"Weekly_Report_{week_name}{self.weekly_ext}"
+            jobs[week_name] = (archive_path, sorted(p for p in week_dir.iterdir() if p.is_file()))
+
+        packaged_weeks = self._sync_all("weeks", jobs, config.ARCHIVE_WEEKLY_COMPRESSION)
+        count = len(packaged_weeks)
             
-        config.logger.info(f"Packaged {count} weekly archives.")
-        print(f"📦 Created {count} Weekly ZIP Packages.")
+        config.logger.info(f"Packaged {count} weekly archives ({len(jobs) - count} unchanged).")
+        print(f"📦 Updated {count} Weekly {self.weekly_ext} Packages.")
         return packaged_weeks
 
     def package_by_month(self):
         """
-        Groups weekly ZIPs by month and creates monthly archives.
+        Groups weekly archives by calendar month (via the shared DateIndex) and creates monthly archives.
         Structure: weekly_archives/Weekly_Report_2024-W01.zip -> monthly_archives/Monthly_Report_2024-01.zip
         
         Hierarchy: Day files → Weekly folders → Weekly ZIPs → Monthly ZIPs
+        Only months containing a changed weekly ZIP are touched.
         """
         # First, package weeks
         self.package_by_week()
         
         config.logger.info("Starting Monthly Packaging...")
         
-        # Find all weekly ZIPs
-        weekly_zips = list(self.weekly_archive_dir.glob("Weekly_Report_*.zip"))
+        # Weekly archives known to the manifest, keyed by week label
+        weekly_archives = {
+            week: self.weekly_archive_dir / entry["archive"]
+            for week, entry in self.manifest["weeks"].items()
+            if entry["archive"].endswith(self.weekly_ext)
+            and (self.weekly_archive_dir / entry["archive"]).exists()
+        }
         
-        if not weekly_zips:
+        if not weekly_archives:
+            self._prune("months", self.monthly_archive_dir, set())
             print("⚠️  No weekly archives to package into months.")
             return
 
-        # Group by month
+        # Group by month: each ISO week belongs to the month containing its Thursday
+        index = DateIndex.load()
         zips_by_month = {}
-        for zip_path in weekly_zips:
-            # Extract week string: "Weekly_Report_2024-W01.zip" -> "2024-W01"
-            week_str = zip_path.stem.replace("Weekly_Report_", "")
-            
+        for week_str, zip_path in weekly_archives.items():
             try:
-                # Parse year and week number
-                year = int(week_str[:4])
-                week_num = int(week_str.split("W")[1])
-                
-                # Convert week to approximate month
-                # Week 1-4 ≈ January, Week 5-8 ≈ February, etc.
-                month = min(12, max(1, (week_num - 1) // 4 + 1))
-                month_key = f"{year}-{month:02d}"
-                
-                if month_key not in zips_by_month:
-                    zips_by_month[month_key] = []
-                zips_by_month[month_key].append(zip_path)
-            except (ValueError, IndexError):
+                month_key = index.month_of_week(week_str)
+            except ValueError:
+                config.logger.warning(f"Skipping weekly archive with unrecognised week label: {week_str}")
                 continue
+            zips_by_month.setdefault(month_key, []).append(zip_path)
 
-        # Create monthly archives
-        count = 0
-        for month, zip_list in zips_by_month.items():
-            # Create temp folder for this month
-            temp_month_dir = self.monthly_archive_dir / f"temp_{month}"
-            temp_month_dir.mkdir(exist_ok=True)
-            
-            # Copy weekly ZIPs there
-            for z in zip_list:
-                shutil.copy(z, temp_month_dir)
-            
-            # Create monthly ZIP
-            zip_name = self.monthly_archive_dir / f"Monthly_Report_{month}"
-            shutil.make_archive(str(zip_name), 'zip', temp_month_dir)
-            
-            # Cleanup temp folder
-            shutil.rmtree(temp_month_dir)
-            count += 1
+        # Create / update monthly archives straight from the weekly archives (no temp copies)
+        jobs = {
+            month: (self.monthly_archive_dir / f"Monthly_Report_{month}{self.monthly_ext}", sorted(zip_list))
+            for month, zip_list in zips_by_month.items()
+        }
+        self._prune("months", self.monthly_archive_dir, jobs.keys())
+        count = len(self._sync_all("months", jobs, config.ARCHIVE_MONTHLY_COMPRESSION))
             
-        config.logger.info(f"Packaged {count} monthly archives.")
-        print(f"📦 Created {count} Monthly ZIP Packages (containing weekly ZIPs).")
+        config.logger.info(f"Packaged {count} monthly archives ({len(jobs) - count} unchanged).")
+        print(f"📦 Updated {count} Monthly {self.monthly_ext} Packages (containing weekly archives).")
 
 
 # Backwards compatibility
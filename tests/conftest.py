@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# config.BASE_DIR is "c:/data_cleaner", a relative path off Windows: importing
+# config creates it under the working directory, so keep that out of the checkout.
+os.chdir(tempfile.mkdtemp(prefix="data_cleaner_tests_"))
+
+import config  # noqa: E402
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch):
+    """Points config's raw/output paths at a fresh temporary tree."""
+    raw_dir = tmp_path / "raw_data"
+    output_dir = tmp_path / "output"
+    raw_dir.mkdir()
+    output_dir.mkdir()
+    monkeypatch.setattr(config, "RAW_DATA_DIR", raw_dir)
+    monkeypatch.setattr(config, "OUTPUT_DIR", output_dir)
+    monkeypatch.setattr(config, "DB_PATH", tmp_path / "banking.db")
+    monkeypatch.setattr(config, "PARQUET_STORE_DIR", output_dir / "master_store")
+    monkeypatch.setattr(config, "ROLLUP_DIR", output_dir / "rollups")
+    return tmp_path
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from ai_interface import BankingAI, QueryCache
+
+
+@pytest.fixture
+def df():
+    n = 40
+    return pd.DataFrame({
+        'Transaction_ID': range(n),
+        'Transaction_Date': pd.date_range('2023-01-01', periods=n, freq='7D'),
+        'Amount': [float(i * 10) for i in range(n)],
+        'Branch': ['London', 'Tokyo'] * (n // 2),
+        'Transaction_Type': ['Credit', 'Debit', 'Debit', 'Credit'] * (n // 4),
+        'Customer_Name': [f"Customer_{i % 5}" for i in range(n)],
+    })
+
+
+def test_rephrasings_share_an_entry(df):
+    cache = QueryCache(max_entries=8, max_mb=1)
+    ai = BankingAI(df=df, version="v1", cache=cache)
+
+    first = ai.process_query("total for london in 2023")
+    second = ai.process_query("What is the total for London in 2023?")
+
+    assert second['text'] == first['text']
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_cached_frames_cannot_be_mutated_by_callers(df):
+    cache = QueryCache(max_entries=8, max_mb=1)
+    ai = BankingAI(df=df, version="v1", cache=cache)
+
+    answer = ai.process_query("top 3 transactions")
+    expected = answer['data'].copy()
+    answer['data'].loc[:, 'Amount'] = -1.0
+
+    again = ai.process_query("top 3 transactions")
+    pd.testing.assert_frame_equal(again['data'], expected)
+    again['data'].drop(columns='Amount', inplace=True)
+    assert 'Amount' in ai.process_query("top 3 transactions")['data'].columns
+
+
+def test_new_version_drops_older_answers(df):
+    cache = QueryCache(max_entries=8, max_mb=1)
+    BankingAI(df=df, version="v1", cache=cache).process_query("total for london")
+    BankingAI(df=df, version="v2", cache=cache).process_query("total for london")
+
+    stats = cache.stats()
+    assert stats["hits"] == 0 and stats["invalidations"] == 1 and stats["entries"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QueryCache(max_entries=2, max_mb=1)
+    for key in ("a", "b"):
+        cache.put("v1", key, {"text": key, "data": None})
+    cache.get("v1", "a")
+    cache.put("v1", "c", {"text": "c", "data": None})
+
+    assert cache.get("v1", "b") is None
+    assert cache.get("v1", "a")["text"] == "a"
+    assert cache.get("v1", "c")["text"] == "c"
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ai_interface import BankingAI, markdown_table, parse_date_range, parse_metric, parse_top_n
+
+Y = lambda year: pd.Timestamp(year=year, month=1, day=1)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("total in 2023", (Y(2023), Y(2024), "in 2023")),
+    ("transactions during 2021", (Y(2021), Y(2022), "in 2021")),
+    ("count since 2021", (Y(2021), None, "since 2021")),
+    ("average before 2020", (None, Y(2020), "before 2020")),
+    ("totals from 2020 to 2022", (Y(2020), Y(2023), "from 2020 to 2022")),
+    ("sum between 2022 and 2019", (Y(2019), Y(2023), "from 2019 to 2022")),
+    ("top 2000 transactions", (None, None, None)),
+    ("top 2000 transactions in 2023", (Y(2023), Y(2024), "in 2023")),
+    ("customer 2023 total", (None, None, None)),
+])
+def test_years_need_a_date_word(query, expected):
+    assert parse_date_range(query) == expected
+
+
+def test_other_date_forms_still_parse():
+    anchor = pd.Timestamp('2024-06-15 13:00')
+    assert parse_date_range("total in march 2023")[:2] == (Y(2023).replace(month=3), Y(2023).replace(month=4))
+    assert parse_date_range("since 2023-05-01")[:2] == (pd.Timestamp('2023-05-01'), None)
+    start, end, _ = parse_date_range("count in the last 7 days", anchor=anchor)
+    assert (start, end) == (pd.Timestamp('2024-06-09'), pd.Timestamp('2024-06-16'))
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("top 5 customers", (5, 'Customer_Name')),
+    ("highest spending customers", (10, 'Customer_Name')),
+    ("top 3 by amount of branches", (3, 'Branch')),
+    ("largest 4 transaction types", (4, 'Transaction_Type')),
+    ("top 20 transactions for london branch", (20, None)),
+    ("biggest transactions", (10, None)),
+    ("total for london", (None, None)),
+])
+def test_top_n_targets(query, expected):
+    assert parse_top_n(query) == expected
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("how many transactions", 'count'),
+    ("average amount", 'average'),
+    ("monthly totals", 'total'),
+    ("sums by branch", 'total'),
+    ("show transactions", None),
+])
+def test_metric(query, expected):
+    assert parse_metric(query) == expected
+
+
+def test_markdown_table_renders_missing_values_as_a_dash():
+    groups = pd.DataFrame({'Branch': ['London', 'Tokyo'], 'Average': [12.5, np.nan]})
+    table = markdown_table(groups, 'Average')
+    assert "| London | $12.50 |" in table
+    assert "| Tokyo | — |" in table
+    assert "nan" not in table
+
+
+def test_groups_and_rankings_default_to_totals():
+    df = pd.DataFrame({
+        'Transaction_Date': pd.date_range('2023-01-01', periods=6, freq='MS'),
+        'Amount': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        'Branch': ['London', 'Tokyo'] * 3,
+        'Transaction_Type': ['Credit'] * 6,
+        'Customer_Name': ['A', 'B', 'C'] * 2,
+    })
+    ai = BankingAI(df=df)
+    assert ai.parse_query("monthly for london")["metric"] == 'total'
+    assert ai.parse_query("highest spending customers")["metric"] == 'total'
+    assert ai.parse_query("top 2000 transactions")["start"] is None
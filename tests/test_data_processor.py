@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("validators")
+pytest.importorskip("cleaners")
+
+import data_processor  # noqa: E402
+
+
+class FakeDB:
+    """iter_chunks() over an endless run of tiny chunks, recording when it is closed."""
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def iter_chunks(self, after_rowid=0, upto_rowid=None):
+        key = after_rowid
+        try:
+            while True:
+                key += 1
+                yield key, pd.DataFrame({'Transaction_ID': [key]})
+        finally:
+            self.closed.set()
+
+
+def _no_clean(df):
+    return df, pd.DataFrame(), {}
+
+
+def test_closing_early_stops_reader_and_closes_connection(monkeypatch):
+    monkeypatch.setattr(data_processor, "validate_and_clean", _no_clean)
+    db = FakeDB()
+    before = threading.active_count()
+
+    chunks = data_processor.iter_processed_chunks(db, 0, None, workers=2, queue_depth=1)
+    first = next(chunks)
+    chunks.close()
+
+    assert first[0] == 1
+    assert db.closed.wait(5)
+    deadline = time.time() + 5
+    while threading.active_count() > before and time.time() < deadline:
+        time.sleep(0.05)
+    assert threading.active_count() == before
+
+
+def test_consumer_exception_stops_reader(monkeypatch):
+    monkeypatch.setattr(data_processor, "validate_and_clean", _no_clean)
+    db = FakeDB()
+
+    with pytest.raises(RuntimeError):
+        for _ in data_processor.iter_processed_chunks(db, 0, None, workers=2, queue_depth=1):
+            raise RuntimeError("writer failed")
+
+    assert db.closed.wait(5)
+
+
+class FakeLoader:
+    def __init__(self):
+        self.loaded = []
+
+    def load_chunks(self, frames):
+        frames = list(frames)
+        if frames == ["bad"]:
+            raise ValueError("bad file")
+        self.loaded.extend(frames)
+
+    def close(self):
+        pass
+
+
+def test_ingest_claims_bounded_batches_and_skips_failed_files(data_dirs, monkeypatch):
+    import config
+    import file_handoff
+
+    incoming = config.RAW_DATA_DIR / "incoming"
+    incoming.mkdir()
+    monkeypatch.setattr(file_handoff, "INCOMING_DIR", incoming)
+    monkeypatch.setattr(file_handoff, "CLAIMED_DIR", config.RAW_DATA_DIR / "claimed")
+    monkeypatch.setattr(config, "CLAIM_BATCH_FILES", 2)
+    for i in range(5):
+        (incoming / f"f{i}.csv").write_text("x")
+        os.utime(incoming / f"f{i}.csv", (1000 + i, 1000 + i))
+
+    loader = FakeLoader()
+    batches = []
+
+    def fake_decode(paths, workers=None):
+        batches.append([p.name for p in paths])
+        for p in paths:
+            yield p, ["bad"] if p.name == "f1.csv" else [p.name], None
+
+    monkeypatch.setattr(data_processor, "BulkLoader", lambda: loader)
+    monkeypatch.setattr(data_processor, "iter_decoded_files", fake_decode)
+
+    assert data_processor.ingest_new_files() == 4
+    assert batches == [["f0.csv", "f1.csv"], ["f2.csv", "f3.csv"], ["f4.csv"]]
+    assert loader.loaded == ["f0.csv", "f2.csv", "f3.csv", "f4.csv"]
+    assert [p.name for p in incoming.iterdir()] == ["f1.csv"]
+    assert list((config.RAW_DATA_DIR / "claimed").iterdir()) == []
@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+import config
+from db_connector import BankingDatabase
+
+
+@pytest.fixture
+def db(data_dirs):
+    conn = sqlite3.connect(config.DB_PATH)
+    conn.execute(f"CREATE TABLE {config.TABLE_NAME} (Transaction_ID INTEGER, Amount REAL)")
+    conn.executemany(f"INSERT INTO {config.TABLE_NAME} VALUES (?, ?)",
+                     [(i, i * 1.5) for i in range(1, 26)])
+    conn.commit()
+    conn.close()
+    return BankingDatabase()
+
+
+def test_iter_chunks_pages_by_rowid(db):
+    chunks = list(db.iter_chunks(limit=10))
+
+    assert [len(df) for _, df in chunks] == [10, 10, 5]
+    assert [key for key, _ in chunks] == [10, 20, 25]
+    ids = [i for _, df in chunks for i in df['Transaction_ID']]
+    assert ids == list(range(1, 26))
+    assert '_rowid' not in chunks[0][1].columns
+
+
+def test_iter_chunks_resumes_after_key(db):
+    chunks = list(db.iter_chunks(after_rowid=20, limit=10))
+
+    assert [key for key, _ in chunks] == [25]
+    assert chunks[0][1]['Transaction_ID'].tolist() == [21, 22, 23, 24, 25]
+
+
+def test_iter_chunks_stops_at_snapshot_bound(db):
+    chunks = db.iter_chunks(limit=10, upto_rowid=12)
+    first = next(chunks)
+
+    # Rows appended mid-run are left for the next batch
+    conn = sqlite3.connect(config.DB_PATH)
+    conn.execute(f"INSERT INTO {config.TABLE_NAME} VALUES (99, 1.0)")
+    conn.commit()
+    conn.close()
+
+    rest = list(chunks)
+    assert first[0] == 10
+    assert [key for key, _ in rest] == [12]
+    assert db.get_max_rowid() == 26
+
+
+def test_iter_chunks_survives_deleted_rows(db):
+    conn = sqlite3.connect(config.DB_PATH)
+    conn.execute(f"DELETE FROM {config.TABLE_NAME} WHERE Transaction_ID BETWEEN 5 AND 14")
+    conn.commit()
+    conn.close()
+
+    ids = [i for _, df in db.iter_chunks(limit=4) for i in df['Transaction_ID']]
+    assert ids == list(range(1, 5)) + list(range(15, 26))
+
+
+def test_rowid_at_offset_migrates_legacy_state(db):
+    assert db.rowid_at_offset(0) == 0
+    assert db.rowid_at_offset(7) == 7
+    assert db.rowid_at_offset(1000) == 25
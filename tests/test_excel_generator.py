@@ -0,0 +1,59 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import config
+import excel_generator
+from excel_generator import regenerate_days
+
+
+def _master(days):
+    dates = pd.date_range('2024-01-01', periods=days, freq='D')
+    return pd.DataFrame({
+        'Transaction_ID': range(days),
+        'Transaction_Date': dates,
+        'Amount': [10.0] * days,
+        'Branch': ['London'] * days,
+        'Transaction_Type': ['Credit'] * days,
+    })
+
+
+def _read_range(df):
+    def read(start, end):
+        dates = df['Transaction_Date'].dt.date
+        return df[(dates >= start) & (dates <= end)].copy()
+    return read
+
+
+def test_multi_month_regeneration_shares_one_pool(data_dirs, monkeypatch):
+    pools = []
+
+    class RecordingPool(ThreadPoolExecutor):
+        def __init__(self, max_workers=None):
+            super().__init__(max_workers=max_workers)
+            self.submitted = 0
+            pools.append(self)
+
+        def submit(self, fn, *args):
+            self.submitted += 1
+            return super().submit(fn, *args)
+
+    monkeypatch.setattr(excel_generator, "ProcessPoolExecutor", RecordingPool)
+    monkeypatch.setattr(config, "REPORT_PARALLEL_MIN_DAYS", 50)
+    df = _master(90)  # Three months, none over 31 days
+
+    count = regenerate_days(df['Transaction_Date'].dt.date, _read_range(df), workers=4)
+
+    assert count == 90
+    assert len(pools) == 1 and pools[0].submitted == 90
+    assert len(list((config.OUTPUT_DIR / "daily_reports").rglob("*.xlsx"))) == 90
+
+
+def test_few_dirty_days_stay_in_process(data_dirs, monkeypatch):
+    monkeypatch.setattr(excel_generator, "ProcessPoolExecutor", None)  # Must not be used
+    monkeypatch.setattr(config, "REPORT_PARALLEL_MIN_DAYS", 50)
+    df = _master(40)
+
+    assert regenerate_days(df['Transaction_Date'].dt.date, _read_range(df), workers=4) == 40
+    # Unchanged days are skipped on a second pass
+    assert regenerate_days(df['Transaction_Date'].dt.date, _read_range(df), workers=4) == 0
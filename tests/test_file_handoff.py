@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+import file_handoff
+from file_handoff import FileClaim, recover_stale_claims, release_claim
+
+
+@pytest.fixture
+def handoff_dirs(tmp_path, monkeypatch):
+    incoming = tmp_path / "incoming"
+    claimed = tmp_path / "claimed"
+    incoming.mkdir()
+    monkeypatch.setattr(file_handoff, "INCOMING_DIR", incoming)
+    monkeypatch.setattr(file_handoff, "CLAIMED_DIR", claimed)
+    return incoming, claimed
+
+
+def _drop(incoming, *names):
+    for name in names:
+        (incoming / name).write_text(name)
+    return [incoming / name for name in names]
+
+
+def test_take_claims_a_bounded_batch(handoff_dirs):
+    incoming, _ = handoff_dirs
+    paths = _drop(incoming, *(f"f{i}.csv" for i in range(6)))
+
+    with FileClaim() as claim:
+        batch = claim.take(paths, 4)
+        assert [p.name for p in batch] == ["f0.csv", "f1.csv", "f2.csv", "f3.csv"]
+        assert sorted(p.name for p in incoming.iterdir()) == ["f4.csv", "f5.csv"]
+        # Files another worker already took are skipped
+        assert [p.name for p in claim.take(paths, 4)] == ["f4.csv", "f5.csv"]
+
+
+def test_live_claim_is_not_recovered(handoff_dirs):
+    incoming, _ = handoff_dirs
+    with FileClaim() as claim:
+        claimed = claim.take(_drop(incoming, "a.csv"), 4)
+        # Same process, but the claim is still held by a running ingest
+        assert recover_stale_claims() == 0
+        assert claimed[0].exists()
+
+
+def test_close_returns_leftovers(handoff_dirs):
+    incoming, claimed_dir = handoff_dirs
+    with FileClaim() as claim:
+        claim.take(_drop(incoming, "a.csv", "b.csv"), 4)
+    assert sorted(p.name for p in incoming.iterdir()) == ["a.csv", "b.csv"]
+    assert list(claimed_dir.iterdir()) == []
+
+
+def test_abandoned_claims_are_recovered(handoff_dirs):
+    incoming, claimed_dir = handoff_dirs
+    # A run of this very process that died without closing its claim
+    claim = FileClaim().open()
+    claim.take(_drop(incoming, "a.csv"), 4)
+    claim._lock.close()
+    # A claim directory left by an older version (no lock file)
+    legacy = claimed_dir / str(os.getpid())
+    legacy.mkdir()
+    (legacy / "b.csv").write_text("b")
+
+    assert recover_stale_claims() == 2
+    assert sorted(p.name for p in incoming.iterdir()) == ["a.csv", "b.csv"]
+    assert list(claimed_dir.iterdir()) == []
+
+
+def test_release_never_overwrites_a_new_arrival(handoff_dirs):
+    incoming, _ = handoff_dirs
+    with FileClaim() as claim:
+        claimed = claim.take(_drop(incoming, "batch.csv.gz"), 4)[0]
+        (incoming / "batch.csv.gz").write_text("newer")
+
+        returned = release_claim(claimed)
+
+    assert (incoming / "batch.csv.gz").read_text() == "newer"
+    assert returned.name.startswith("batch-") and returned.name.endswith(".csv.gz")
+    assert returned.read_text() == "batch.csv.gz"
+    assert not claimed.exists()
@@ -0,0 +1,10 @@
+import pandas as pd
+
+from mock_data_gen import SEEDED_END, iter_mock_chunks
+
+
+def test_seed_alone_reproduces_the_data():
+    first = pd.concat(iter_mock_chunks(500, chunk_rows=200, seed=7), ignore_index=True)
+    second = pd.concat(iter_mock_chunks(500, chunk_rows=200, seed=7), ignore_index=True)
+    pd.testing.assert_frame_equal(first, second)
+    assert pd.to_datetime(first['Transaction_Date']).max() <= pd.Timestamp(SEEDED_END)
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+import config
+import parquet_store
+from parquet_store import CsvMonthBuckets, ParquetMasterStore, read_csv_range
+
+
+@pytest.fixture
+def master_csv(data_dirs):
+    path = config.OUTPUT_DIR / "master_clean_data.csv"
+    pd.DataFrame({
+        'Transaction_ID': range(120),
+        'Transaction_Date': pd.date_range('2023-11-01', periods=120, freq='D'),
+        'Amount': [float(i) for i in range(120)],
+        'Branch': ['London', 'Tokyo'] * 60,
+        'Transaction_Type': 'Credit',
+    }).to_csv(path, index=False)
+    return path
+
+
+def test_month_buckets_match_range_reads(master_csv):
+    months = [(2023, 12), (2024, 2)]
+    with CsvMonthBuckets(master_csv, months) as buckets:
+        for start, end in [('2023-12-01', '2023-12-31'), ('2024-02-10', '2024-02-12')]:
+            start, end = pd.Timestamp(start), pd.Timestamp(end)
+            expected = read_csv_range(master_csv, start_date=start, end_date=end)
+            pd.testing.assert_frame_equal(buckets.read_range(start, end), expected)
+        assert buckets.read_range(pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-06')) is None
+        tmp_dir = buckets.paths[(2023, 12)].parent
+    assert not tmp_dir.exists()
+
+
+def test_month_buckets_scan_the_master_once(master_csv, monkeypatch):
+    scans = []
+    read_csv = pd.read_csv
+
+    def counting_read_csv(path, *args, **kwargs):
+        if path == master_csv:
+            scans.append(path)
+        return read_csv(path, *args, **kwargs)
+
+    monkeypatch.setattr(parquet_store.pd, "read_csv", counting_read_csv)
+    months = [(2023, 11), (2023, 12), (2024, 1), (2024, 2)]
+    with CsvMonthBuckets(master_csv, months, chunksize=25) as buckets:
+        total = sum(len(buckets.read_range(pd.Timestamp(y, m, 1), pd.Timestamp(y, m, 1) + pd.offsets.MonthEnd()))
+                    for y, m in months)
+    assert total == 120
+    assert len(scans) == 1
+
+
+def test_store_date_range_read(master_csv):
+    store = ParquetMasterStore()
+    store.rebuild_from_csv(master_csv)
+
+    df = store.read(columns=['Transaction_ID', 'Transaction_Date'], start_date='2023-12-30', end_date='2024-01-02')
+    assert df['Transaction_ID'].tolist() == [59, 60, 61, 62]
+    assert df['Transaction_Date'].dt.date.astype(str).tolist()[0] == '2023-12-30'
@@ -0,0 +1,223 @@
+import csv
+import re
+import sqlite3
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("psycopg2")
+
+import pg_fetcher  # noqa: E402
+
+
+class FakeCursor:
+    """
+    The slice of the psycopg2 cursor protocol pg_fetcher uses, over sqlite:
+    execute/fetchone, mogrify and copy_expert (COPY (query) TO STDOUT as CSV).
+    """
+    def __init__(self, conn, log):
+        self._conn = conn
+        self._cursor = conn.cursor()
+        self._log = log
+        self.rowcount = -1
+
+    def execute(self, sql, params=None):
+        self._log.append(sql)
+        self._cursor.execute(sql.replace("%s", "?"), params or ())
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def mogrify(self, sql, params):
+        literals = [str(p) if isinstance(p, (int, float)) else "'" + str(p).replace("'", "''") + "'"
+                    for p in params]
+        return (sql.replace("%s", "{}").format(*literals)).encode()
+
+    def copy_expert(self, sql, f):
+        self._log.append(sql)
+        query = re.match(r"COPY \((.*)\) TO STDOUT", sql, re.S).group(1)
+        cursor = self._conn.execute(query)
+        writer = csv.writer(f)
+        writer.writerow([d[0] for d in cursor.description])
+        rows = cursor.fetchall()
+        writer.writerows(rows)
+        self.rowcount = len(rows)
+
+    def __getattr__(self, name):  # description/fetchall for pandas.read_sql_query
+        return getattr(self._cursor, name)
+
+    def close(self):
+        self._cursor.close()
+
+
+class FakeConnection:
+    def __init__(self):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.statements = []
+
+    def cursor(self):
+        return FakeCursor(self._conn, self.statements)
+
+    def insert(self, ids):
+        self._conn.executemany("INSERT INTO ledger VALUES (?, ?)", [(i, i * 2.5) for i in ids])
+        self._conn.commit()
+
+
+@pytest.fixture
+def conn(tmp_path, monkeypatch):
+    monkeypatch.setattr(pg_fetcher, "RAW_DATA_DIR", tmp_path / "incoming")
+    monkeypatch.setattr(pg_fetcher, "STATE_FILE", tmp_path / "pg_fetcher_state.json")
+    fake = FakeConnection()
+    fake._conn.execute("CREATE TABLE ledger (id INTEGER, amount REAL)")
+    fake.insert(range(1, 6))
+    return fake
+
+
+def test_incremental_fetch_advances_watermark(conn):
+    first = pg_fetcher.fetch_incremental(conn, "ledger", "id")
+    assert pd.read_csv(first)['id'].tolist() == [1, 2, 3, 4, 5]
+    assert pg_fetcher.load_watermarks()["ledger"] == {"column": "id", "value": 5}
+
+    # Nothing new: no file, watermark unchanged
+    assert pg_fetcher.fetch_incremental(conn, "ledger") is None
+    assert list(pg_fetcher.RAW_DATA_DIR.iterdir()) == [first]
+
+    conn.insert(range(6, 9))
+    second = pg_fetcher.fetch_incremental(conn, "ledger")
+    assert pd.read_csv(second)['id'].tolist() == [6, 7, 8]
+    assert pg_fetcher.load_watermarks()["ledger"]["value"] == 8
+
+
+def test_incremental_fetch_uses_copy_row_count(conn):
+    pg_fetcher.fetch_incremental(conn, "ledger", "id")
+    assert not any("COUNT(*)" in sql for sql in conn.statements)
+
+
+def test_incremental_fetch_needs_a_watermark_column(conn):
+    assert pg_fetcher.fetch_incremental(conn, "ledger") is None
+    assert not pg_fetcher.STATE_FILE.exists()
+
+
+def test_failed_copy_leaves_no_partial_file(conn, monkeypatch):
+    def broken_copy(conn, query, path):
+        open(path, "w").close()
+        raise RuntimeError("connection lost")
+
+    monkeypatch.setattr(pg_fetcher, "copy_query_to_csv", broken_copy)
+    with pytest.raises(RuntimeError):
+        pg_fetcher.fetch_incremental(conn, "ledger", "id")
+    assert list(pg_fetcher.RAW_DATA_DIR.iterdir()) == []
+    assert not pg_fetcher.STATE_FILE.exists()
+
+
+@pytest.mark.filterwarnings("ignore::UserWarning")  # pandas warns about non-SQLAlchemy connections
+def test_benchmark_fetch_times_both_paths(conn):
+    baseline, copied = pg_fetcher.benchmark_fetch(conn, "ledger")
+    assert baseline > 0 and copied > 0
+
+
+class FakePool:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def getconn(self):
+        return self.conn
+
+    def putconn(self, conn):
+        pass
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def pool(conn, monkeypatch):
+    conn.insert(range(6, 13))
+    monkeypatch.setattr(pg_fetcher, "ThreadedConnectionPool", lambda *args, **kwargs: FakePool(conn))
+    return conn
+
+
+def test_parallel_range_fetch_publishes_all_shards(pool):
+    files, failed = pg_fetcher.fetch_parallel(["ledger"], workers=1, split_column="id", ranges=3)
+
+    assert failed == []
+    assert [f.name.rsplit("_", 1)[1] for f in files] == ["part0001.csv", "part0002.csv", "part0003.csv"]
+    ids = pd.concat(pd.read_csv(f) for f in files)['id'].tolist()
+    assert sorted(ids) == list(range(1, 13))
+    assert sorted(pg_fetcher.RAW_DATA_DIR.iterdir()) == files
+
+
+def test_parallel_range_failure_discards_sibling_shards(pool, monkeypatch):
+    copy = pg_fetcher.copy_query_to_csv
+
+    def flaky_copy(conn, query, path):
+        if "BETWEEN 5 AND 8" in query:
+            raise RuntimeError("statement timeout")
+        return copy(conn, query, path)
+
+    monkeypatch.setattr(pg_fetcher, "copy_query_to_csv", flaky_copy)
+    files, failed = pg_fetcher.fetch_parallel(["ledger"], workers=1, split_column="id", ranges=3)
+
+    assert files == [] and failed == ["ledger"]
+    assert list(pg_fetcher.RAW_DATA_DIR.iterdir()) == []
+
+
+@pytest.mark.parametrize("flag", ["--incremental", "--stream", "--benchmark"])
+def test_single_table_modes_reject_parallel_fetch(flag, monkeypatch):
+    monkeypatch.setattr("sys.argv", ["pg_fetcher.py", "--table", "a", "b", flag])
+    with pytest.raises(SystemExit) as exc:
+        pg_fetcher.main()
+    assert exc.value.code == 2
+
+
+class FakeNamedCursor:
+    """Server-side cursor stand-in: fetchmany over id/amount rows, optionally failing on fetch N."""
+    description = [("id",), ("amount",)]
+
+    def __init__(self, rows, fail_on_fetch=None):
+        self._rows = rows
+        self._fetches = 0
+        self._fail_on_fetch = fail_on_fetch
+        self.closed = False
+
+    def execute(self, sql):
+        pass
+
+    def fetchmany(self, size):
+        self._fetches += 1
+        if self._fetches == self._fail_on_fetch:
+            raise ConnectionError("server closed the connection unexpectedly")
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+class FakeStreamConnection:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def cursor(self, name=None):
+        return self._cursor
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet"])
+def test_stream_publishes_every_shard_at_the_end(conn, fmt):
+    cursor = FakeNamedCursor([(i, i * 2.5) for i in range(10)])
+    files = pg_fetcher.stream_table(FakeStreamConnection(cursor), "ledger", fmt=fmt, shard_rows=4, itersize=3)
+
+    assert [f.name.rsplit("_", 1)[1] for f in files] == [f"part000{i}.{fmt}" for i in (1, 2, 3)]
+    assert sorted(p.name for p in pg_fetcher.RAW_DATA_DIR.iterdir()) == sorted(f.name for f in files)
+    read = pd.read_csv if fmt == "csv" else pd.read_parquet
+    assert pd.concat([read(f) for f in files])['id'].tolist() == list(range(10))
+
+
+def test_stream_failure_leaves_no_shards(conn):
+    cursor = FakeNamedCursor([(i, i * 2.5) for i in range(10)], fail_on_fetch=4)
+    with pytest.raises(ConnectionError):
+        pg_fetcher.stream_table(FakeStreamConnection(cursor), "ledger", shard_rows=4, itersize=3)
+
+    # Shard 1 was complete and shard 2 open when the connection dropped
+    assert list(pg_fetcher.RAW_DATA_DIR.iterdir()) == []
+    assert cursor.closed
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from query_engine import QueryEngine
+
+
+@pytest.fixture(scope="module")
+def df():
+    rng = np.random.default_rng(3)
+    n = 2000
+    frame = pd.DataFrame({
+        'Transaction_Date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 730, n), unit='D'),
+        'Amount': rng.integers(1, 1000, n).astype(float),
+        'Branch': rng.choice(['London', 'london', 'Tokyo', 'Mumbai'], n),
+        'Transaction_Type': rng.choice(['Credit', 'Debit'], n),
+        'Customer_Name': rng.choice([f"Customer_{i}" for i in range(20)], n),
+    })
+    frame.loc[rng.choice(n, 50, replace=False), 'Amount'] = np.nan
+    frame.loc[rng.choice(n, 10, replace=False), 'Transaction_Date'] = pd.NaT
+    return frame
+
+
+@pytest.fixture(scope="module")
+def engine(df):
+    return QueryEngine(df)
+
+
+def _expected(df, branch=None, t_type=None, start=None, end=None):
+    rows = df
+    if branch is not None:
+        rows = rows[rows['Branch'].str.lower() == branch]
+    if t_type is not None:
+        rows = rows[rows['Transaction_Type'].str.lower() == t_type]
+    if start is not None:
+        rows = rows[rows['Transaction_Date'] >= pd.Timestamp(start)]
+    if end is not None:
+        rows = rows[rows['Transaction_Date'] < pd.Timestamp(end)]
+    return rows
+
+
+def test_case_variants_share_one_label(engine):
+    assert engine.labels['Branch']['london'] == [engine.names['Branch'].index('London'),
+                                                 engine.names['Branch'].index('london')]
+    found = engine.find_labels('Branch', "total for london in 2023")
+    assert [(label, len(codes)) for label, codes in found] == [('London', 2)]
+
+
+@pytest.mark.parametrize("branch, t_type, start, end", [
+    (None, None, None, None),
+    ('london', None, None, None),
+    ('london', 'credit', '2023-03-01', '2024-03-01'),
+    ('tokyo', 'debit', None, '2023-07-01'),
+    (None, 'credit', pd.Timestamp('2024-01-01', tz='UTC'), None),
+])
+def test_select_matches_pandas(df, engine, branch, t_type, start, end):
+    sel = engine.select(
+        branches=engine.labels['Branch'][branch] if branch else None,
+        types=engine.labels['Transaction_Type'][t_type] if t_type else None,
+        start=start, end=end,
+    )
+    naive = lambda ts: pd.Timestamp(ts).tz_localize(None) if ts is not None and pd.Timestamp(ts).tzinfo else ts
+    expected = _expected(df, branch, t_type, naive(start), naive(end))
+
+    assert sel.count() == len(expected)
+    assert sel.sum() == pytest.approx(expected['Amount'].sum())
+    assert sel.mean() == pytest.approx(expected['Amount'].mean())
+
+
+def test_group_totals_match_pandas(df, engine):
+    rows = _expected(df, 'london')
+    groups = engine.select(branches=engine.labels['Branch']['london']).group_totals('Customer_Name')
+    expected = rows.groupby('Customer_Name')['Amount'].agg(['sum', 'size', 'mean'])
+
+    groups = groups.set_index('Customer_Name').sort_index()
+    np.testing.assert_allclose(groups['Amount'], expected['sum'])
+    np.testing.assert_array_equal(groups['Count'], expected['size'])
+    np.testing.assert_allclose(groups['Average'], expected['mean'])
+    # One definition of "count" everywhere: rows, missing amounts included
+    assert groups['Count'].sum() == engine.select(branches=engine.labels['Branch']['london']).count()
+
+
+def test_top_rows_are_the_largest_amounts(df, engine):
+    top = engine.select().top_rows(5)
+    assert list(top['Amount']) == sorted(df['Amount'].dropna().nlargest(5), reverse=True)
@@ -0,0 +1,73 @@
+import json
+
+import config
+from report_manifest import MIGRATION_MARKER, ReportManifest, migrate_week_folders
+from temporal_packager import TemporalPackager
+
+
+def _report(reports, week, day, content=b"x"):
+    path = reports / week / f"Bank_Report_{day}.xlsx"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def _legacy_tree(reports):
+    """%W folders: 2023-01-01 sat in 2023-W00 and 2024-12-30 in 2024-W53."""
+    manifest = ReportManifest()
+    _report(reports, "2023-W00", "2023-01-01")
+    kept = _report(reports, "2023-W01", "2023-01-02")  # Same week under both schemes
+    legacy = _report(reports, "2024-W53", "2024-12-30", b"legacy")
+    iso = _report(reports, "2025-W01", "2024-12-30", b"iso")
+    manifest.record("2023-01-01", reports / "2023-W00" / "Bank_Report_2023-01-01.xlsx", 1, "h1")
+    manifest.record("2023-01-02", kept, 1, "h2")
+    manifest.record("2024-12-30", iso, 1, "h3")
+    manifest.save()
+    return legacy, iso
+
+
+def test_migration_moves_days_into_iso_weeks(data_dirs):
+    reports = config.OUTPUT_DIR / "daily_reports"
+    legacy, iso = _legacy_tree(reports)
+
+    assert migrate_week_folders(reports) == 2
+
+    files = sorted(str(p.relative_to(reports)) for p in reports.glob("*/*.xlsx"))
+    assert files == [
+        "2022-W52/Bank_Report_2023-01-01.xlsx",
+        "2023-W01/Bank_Report_2023-01-02.xlsx",
+        "2025-W01/Bank_Report_2024-12-30.xlsx",
+    ]
+    # The manifest's copy wins a collision; emptied legacy folders are gone
+    assert iso.read_bytes() == b"iso"
+    assert not (reports / "2023-W00").exists() and not legacy.parent.exists()
+
+    entries = ReportManifest().entries
+    assert entries["2023-01-01"]["file"] == str(reports / "2022-W52" / "Bank_Report_2023-01-01.xlsx")
+    assert entries["2024-12-30"]["file"] == str(iso)
+
+
+def test_migration_runs_once(data_dirs):
+    reports = config.OUTPUT_DIR / "daily_reports"
+    _legacy_tree(reports)
+    migrate_week_folders(reports)
+    assert (reports / MIGRATION_MARKER).exists()
+
+    _report(reports, "2023-W00", "2023-01-01")
+    assert migrate_week_folders(reports) == 0
+
+
+def test_packager_drops_archives_of_legacy_weeks(data_dirs):
+    reports = config.OUTPUT_DIR / "daily_reports"
+    _legacy_tree(reports)
+    packager = TemporalPackager(workers=1)
+    legacy_archive = packager.weekly_archive_dir / "Weekly_Report_2024-W53.zip"
+    legacy_archive.write_bytes(b"old")
+    packager.manifest["weeks"]["2024-W53"] = {"archive": legacy_archive.name, "sources": {}}
+
+    packager.package_by_month()
+
+    assert not legacy_archive.exists()
+    manifest = json.loads(packager.manifest_file.read_text())
+    assert sorted(manifest["weeks"]) == ["2022-W52", "2023-W01", "2025-W01"]
+    assert sorted(manifest["months"]) == ["2022-12", "2023-01", "2025-01"]
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import config
+from rollups import RollupStore
+from stream_writer import StreamingWriter
+
+
+def _rows(start, rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Transaction_ID': range(start, start + rows),
+        'Transaction_Date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 60, rows), unit='D'),
+        'Amount': rng.integers(1, 500, rows).astype(float),
+        'Branch': rng.choice(['London', 'Tokyo', 'Mumbai'], rows),
+        'Transaction_Type': rng.choice(['Credit', 'Debit'], rows),
+    })
+
+
+@pytest.fixture
+def small_batches(data_dirs, monkeypatch):
+    monkeypatch.setattr(config, "STREAM_FLUSH_ROWS", 50)
+
+
+def _sorted(daily):
+    return daily.sort_values(['Transaction_Date', 'Branch', 'Transaction_Type']).reset_index(drop=True)
+
+
+def test_incremental_rollups_match_a_rebuild(small_batches):
+    writer = StreamingWriter(overwrite=True, generate_reports=False)
+    for i in range(6):
+        writer.write(_rows(i * 40, 40, seed=i))
+    writer.close()
+    incremental = RollupStore()
+
+    rebuilt = RollupStore(root=config.OUTPUT_DIR / "rebuilt")
+    rebuilt.rebuild()
+
+    pd.testing.assert_frame_equal(_sorted(incremental.daily()), _sorted(rebuilt.daily()))
+    assert incremental.kpis()["total_transactions"] == 240
+    assert incremental.kpis()["total_volume"] == rebuilt.kpis()["total_volume"]
+
+
+def test_first_flush_without_a_store_keeps_history(small_batches):
+    history = _rows(0, 100, seed=1)
+    history.to_csv(config.OUTPUT_DIR / "master_clean_data.csv", index=False)
+    assert not RollupStore().exists()
+
+    # Appending run: the rollup store is created by this batch
+    writer = StreamingWriter(generate_reports=False)
+    batch = _rows(100, 30, seed=2)
+    writer.write(batch)
+    writer.close()
+
+    kpis = RollupStore().kpis()
+    assert kpis["total_transactions"] == 130
+    assert kpis["total_volume"] == pytest.approx(history['Amount'].sum() + batch['Amount'].sum())
+
+
+def test_overwrite_without_rows_leaves_the_rollups_alone(small_batches):
+    _rows(0, 20, seed=3).to_csv(config.OUTPUT_DIR / "master_clean_data.csv", index=False)
+    RollupStore().rebuild()
+
+    # Every incoming file failed: nothing written, master CSV untouched
+    writer = StreamingWriter(overwrite=True, generate_reports=False)
+    writer.close()
+
+    assert len(pd.read_csv(config.OUTPUT_DIR / "master_clean_data.csv")) == 20
+    assert RollupStore().kpis()["total_transactions"] == 20
+
+
+def test_overwrite_replaces_the_rollups_with_the_first_write(small_batches):
+    _rows(0, 20, seed=3).to_csv(config.OUTPUT_DIR / "master_clean_data.csv", index=False)
+    RollupStore().rebuild()
+
+    writer = StreamingWriter(overwrite=True, generate_reports=False)
+    writer.write(_rows(100, 7, seed=4))
+    writer.close()
+
+    assert RollupStore().kpis()["total_transactions"] == 7
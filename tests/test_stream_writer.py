@@ -0,0 +1,84 @@
+import pandas as pd
+import pytest
+
+import config
+from parquet_store import ParquetMasterStore
+from rollups import RollupStore
+from stream_writer import StreamingWriter
+
+
+def _chunk(start, rows=4):
+    return pd.DataFrame({
+        'Transaction_ID': range(start, start + rows),
+        'Transaction_Date': pd.date_range('2024-03-01', periods=rows, freq='D') + pd.Timedelta(days=start),
+        'Amount': [10.0] * rows,
+        'Branch': ['London'] * rows,
+        'Transaction_Type': ['Credit'] * rows,
+    })
+
+
+@pytest.fixture
+def writer(data_dirs, monkeypatch):
+    monkeypatch.setattr(config, "STREAM_FLUSH_ROWS", 8)
+    return StreamingWriter(generate_reports=False, parquet_store=ParquetMasterStore())
+
+
+def test_outputs_advance_together_on_flush(writer):
+    assert writer.write(_chunk(0)) is False
+    # Nothing reaches any output until the batch is flushed
+    assert not writer.output_path.exists()
+    assert not writer.parquet_store.exists()
+    assert not RollupStore().exists()
+
+    assert writer.write(_chunk(4)) is True
+    assert len(pd.read_csv(writer.output_path)) == 8
+    assert len(writer.parquet_store.read()) == 8
+    assert RollupStore().kpis()["total_transactions"] == 8
+
+
+def test_close_flushes_the_tail(writer):
+    writer.write(_chunk(0))
+    writer.write(_chunk(4))
+    writer.write(_chunk(8, rows=3))
+    writer.close()
+
+    assert writer.rows_written == 11
+    assert len(pd.read_csv(writer.output_path)) == 11
+    assert len(writer.parquet_store.read()) == 11
+    assert RollupStore().kpis()["total_transactions"] == 11
+
+
+def test_dirty_days_are_tracked_before_flush(data_dirs):
+    writer = StreamingWriter(update_rollups=False)
+    writer.write(_chunk(0, rows=2))
+    assert sorted(str(d) for d in writer.dirty_days) == ['2024-03-01', '2024-03-02']
+
+
+def test_close_regenerates_dirty_days_from_the_csv(data_dirs):
+    writer = StreamingWriter(update_rollups=False)
+    writer.write(_chunk(0, rows=3))
+    writer.write(_chunk(40, rows=2))  # Next month
+    writer.close()
+
+    reports = sorted(p.name for p in (config.OUTPUT_DIR / "daily_reports").rglob("*.xlsx"))
+    assert reports == ['Bank_Report_2024-03-01.xlsx', 'Bank_Report_2024-03-02.xlsx', 'Bank_Report_2024-03-03.xlsx',
+                       'Bank_Report_2024-04-10.xlsx', 'Bank_Report_2024-04-11.xlsx']
+    assert not writer.dirty_days
+
+
+def test_overwrite_rewrites_the_parquet_store_with_the_csv(data_dirs, monkeypatch):
+    monkeypatch.setattr(config, "STREAM_FLUSH_ROWS", 8)
+    store = ParquetMasterStore()
+    old = StreamingWriter(generate_reports=False, parquet_store=store)
+    old.write(_chunk(0, rows=6))
+    old.close()
+
+    # No rows: neither output is touched
+    StreamingWriter(overwrite=True, generate_reports=False, parquet_store=store).close()
+    assert len(store.read()) == 6
+
+    rebuilt = StreamingWriter(overwrite=True, generate_reports=False, parquet_store=store)
+    rebuilt.write(_chunk(100, rows=3))
+    rebuilt.close()
+    assert store.read()['Transaction_ID'].tolist() == [100, 101, 102]
+    assert pd.read_csv(rebuilt.output_path)['Transaction_ID'].tolist() == [100, 101, 102]
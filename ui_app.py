@@ -1,8 +1,11 @@
 import streamlit as st
 import pandas as pd
 import config
-from ai_interface import BankingAI
+from ai_interface import BankingAI, QUERY_CACHE
 from chart_engine import ChartEngine
+from parquet_store import ParquetMasterStore
+from master_dataset import get_master_dataset
+from rollups import RollupStore
 import os
 
 # Page Config
@@ -17,13 +20,27 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Helper to load data
+# Shared, typed master data: one copy per server process for the dashboard and the assistant
+@st.cache_resource(max_entries=1)
+def load_assistant(version):
+    """`version` is the master data's change token, so new data builds a fresh assistant."""
+    df, _ = get_master_dataset()
+    return BankingAI(df=df, version=version)
+
 @st.cache_data
-def load_data():
-    path = config.OUTPUT_DIR / "master_clean_data.csv"
-    if not path.exists():
-        return None
-    return pd.read_csv(path)
+def load_rollups(version):
+    """Daily rollup table and KPIs; `version` (kpis.json mtime) busts the cache after each batch."""
+    store = RollupStore()
+    return store.daily(), store.kpis()
+
+def rollup_version():
+    store = RollupStore()
+    if not store.exists():
+        if not (config.OUTPUT_DIR / "master_clean_data.csv").exists() and not ParquetMasterStore().exists():
+            return None
+        with st.spinner("Building dashboard rollups (first run)..."):
+            store.rebuild()
+    return store.kpi_file.stat().st_mtime_ns
 
 def main():
     st.title("🏦 AI Banking Data Architect")
@@ -34,6 +51,7 @@ def main():
         st.header("⚙️ Control Panel")
         if st.button("🔄 Reload Data"):
             st.cache_data.clear()
+            st.cache_resource.clear()
             st.rerun()
         
         st.markdown("---")
@@ -44,11 +62,11 @@ def main():
             st.error("❌ No Data Found. Run Pipeline.")
             
     # --- Main Content ---
-    df = load_data()
+    df, version = get_master_dataset()
     
     if df is not None:
-        # Initialize AI
-        ai = BankingAI(str(config.OUTPUT_DIR / "master_clean_data.csv"))
+        # Initialize AI (shares df; rebuilt only when the data version changes)
+        ai = load_assistant(version)
         chart = ChartEngine()
         
         # Tabs
@@ -81,32 +99,58 @@ def main():
                         response_text = result['text']
                         st.markdown(response_text)
                         
+                        data = result.get('data')
+                        has_data = data is not None and not data.empty
+                        
                         # Add Chart if requested or implied
-                        if intent == 'chart' or 'trend' in prompt.lower():
-                            if result['data'] is not None and not result['data'].empty:
-                                fig = chart.plot_trend(result['data'])
-                                st.plotly_chart(fig, use_container_width=True)
+                        if has_data and (intent == 'chart' or 'trend' in prompt.lower()):
+                            if 'Transaction_Date' in data.columns:
+                                fig = chart.plot_trend(data.copy())
+                            else:
+                                fig = chart.plot_distribution(data, category_col=data.columns[0])
+                            st.plotly_chart(fig, use_container_width=True)
+                        elif has_data and result['type'] == 'table':
+                            st.dataframe(data, use_container_width=True)
                         
                 st.session_state.messages.append({"role": "assistant", "content": response_text})
 
         with tab2:
             st.subheader("Executive Overview")
-            col1, col2, col3 = st.columns(3)
-            col1.metric("Total Transactions", len(df))
-            col1.metric("Total Volume", f"${df['Amount'].sum():,.2f}")
-            col2.metric("Avg Transaction", f"${df['Amount'].mean():,.2f}")
-            
-            st.markdown("### Transaction Volume Over Time")
-            fig_trend = chart.plot_trend(df)
-            st.plotly_chart(fig_trend, use_container_width=True)
-            
-            st.markdown("### Branch Distribution")
-            fig_dist = chart.plot_distribution(df, category_col="Branch")
-            st.plotly_chart(fig_dist, use_container_width=True)
+            # Precomputed by the processor (rollups.py): independent of history size
+            version = rollup_version()
+            if version is None:
+                st.info("No rollups yet.")
+            else:
+                daily, kpis = load_rollups(version)
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Total Transactions", kpis["total_transactions"])
+                col1.metric("Total Volume", f"${kpis['total_volume']:,.2f}")
+                col2.metric("Avg Transaction", f"${kpis['avg_transaction']:,.2f}")
+                
+                st.markdown("### Transaction Volume Over Time")
+                daily_totals = daily.groupby('Transaction_Date', as_index=False)['Amount'].sum()
+                fig_trend = chart.plot_trend(daily_totals)
+                st.plotly_chart(fig_trend, use_container_width=True)
+                
+                st.markdown("### Branch Distribution")
+                branch_totals = daily.groupby('Branch', as_index=False)['Amount'].sum()
+                fig_dist = chart.plot_distribution(branch_totals, category_col="Branch")
+                st.plotly_chart(fig_dist, use_container_width=True)
 
         with tab3:
             st.dataframe(df)
 
+        # Rendered last so the counters include this run's question
+        with st.sidebar:
+            st.markdown("---")
+            st.header("⚡ Query Cache")
+            stats = QUERY_CACHE.stats()
+            c1, c2 = st.columns(2)
+            c1.metric("Hits", stats["hits"])
+            c2.metric("Misses", stats["misses"])
+            st.caption(f"Hit rate {stats['hit_rate']:.0%} • {stats['entries']} entries • "
+                       f"{stats['size_mb']:.1f} MB • {stats['invalidations']} invalidations")
+
     else:
         st.warning("Please run the Backend Pipeline (`main.py`) to generate data first.")
 